@@ -1,239 +1,310 @@
 from htmltools._core import Tag
 from shiny import App, ui, reactive, render
-import os
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import (
+    FileResponse, HTMLResponse, PlainTextResponse, Response, StreamingResponse
+)
+from starlette.routing import Mount, Route
+from collections.abc import Iterator
+from pathlib import Path
 import polars as pl
-import io
-import requests
+import gzip
+import math
+import os
+from urllib.parse import quote
 
+import data
+from assets import WWW_DIR, STATIC_PREFIX, StaticCacheMiddleware, asset_url
+from cache import LRUCache
+from debounce import debounce
+from query import facet_cache, facet_counts, filter_cache, filter_key, filter_rows
 from table import output_paginated_table
-from details import render_detail
+from details import render_detail, render_detail_page
 from download import download_tab, send_to_email
-from i18n import i18n, LANG
+from exports import EXPORT_MEDIA_TYPES, export_format, prebuild_exports, resolve_export
+from i18n import i18n, negotiate, validate_catalog, LANGUAGES
+from mailer import mailer
+import metrics
+from metrics import span
 
-# Dataset info
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-REPO = "MGFPKU/MGF_dataset_scraping"
-FILE_PATH: str = "data/data.csv" if LANG == "CN" else "data/data_en.csv"
-BRANCH = "main"
+# Seconds between checks for a swapped-in snapshot; the check itself is an int read
+POLL_INTERVAL = 5
+PER_PAGE = 10
+# Rendered detail views, keyed by row id, data version and language
+detail_cache: LRUCache[ui.HTML] = LRUCache(int(os.getenv("DETAIL_CACHE_SIZE", "1024")))
+# Ship each result once and page in the browser instead of per-click round-trips
+CLIENT_PAGINATION: bool = os.getenv("CLIENT_PAGINATION", "0") == "1"
+# Larger results are paged by the server even in client-side mode
+CLIENT_PAGINATION_MAX_ROWS: int = int(os.getenv("CLIENT_PAGINATION_MAX_ROWS", "5000"))
+# Seconds the keyword must stay unchanged before the table is filtered by it
+KEYWORD_DEBOUNCE: float = float(os.getenv("KEYWORD_DEBOUNCE", "0.3"))
+# Rendered table pages, shared by every session showing the same page
+page_cache: LRUCache[ui.HTML] = LRUCache(int(os.getenv("PAGE_CACHE_SIZE", "1024")))
 
+# refuse to start with UI strings missing from translation.json
+validate_catalog()
 
-def fetch_data():
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3.raw",
-    }
+# load every served language before serving, then keep them fresh in the background
+initial = {lang: data.current(lang) for lang in LANGUAGES}
+data.on_refresh(prebuild_exports)
+for ds in initial.values():
+    prebuild_exports(ds)
+data.start_refresher()
 
-    api_url = f"https://api.github.com/repos/{REPO}/contents/{FILE_PATH}?ref={BRANCH}"
-    res = requests.get(api_url, headers=headers)
-    if res.status_code != 200:
-        raise RuntimeError(f"Failed to fetch file: {res.status_code}\n{res.text}")
-    return pl.read_csv(io.StringIO(res.text))
 
+@metrics.collector
+def _():
+    for lang in LANGUAGES:
+        ds = data.current(lang)
+        yield "mgf_dataset_rows", "gauge", {"lang": lang}, ds.df.height
+        yield "mgf_dataset_version", "gauge", {"lang": lang}, ds.version
+    for name, cache in (
+        ("filter", filter_cache),
+        ("facet", facet_cache),
+        ("page", page_cache),
+        ("detail", detail_cache),
+    ):
+        stats = cache.stats()
+        yield "mgf_cache_hits_total", "counter", {"cache": name}, stats["hits"]
+        yield "mgf_cache_misses_total", "counter", {"cache": name}, stats["misses"]
+        yield "mgf_cache_entries", "gauge", {"cache": name}, stats["size"]
 
-raw_df = fetch_data()
-df = (
-    raw_df.with_columns(
-        pl.col(i18n("时间")).str.strptime(pl.Date, "%m/%Y", strict=False).alias("parsed_time")
-    )
-    .reverse()
-    .sort("parsed_time", descending=True)
-    .drop(["parsed_time", i18n("新闻链接"),i18n("备注")])
-)
 
-# fix region tags
-regions: list[str] = df[i18n("经济体")].drop_nulls().to_list()
-# Split by '；', strip whitespace, flatten
-all_regions = sorted(set(r.strip() for entry in regions for r in entry.split(i18n("；"))))
-
-# compile ui
-app_ui = ui.page_fluid(
-    ui.navset_hidden(
-        ui.nav_panel(
-            "tabview",
-            ui.layout_columns(
-                ui.input_select(
-                    "region",
-                    i18n("经济体"),
-                    choices=[i18n("全部")] + all_regions,
-                ),
-                ui.input_select(
-                    "type",
-                    i18n("政策类型"),
-                    choices=[i18n("全部")] + sorted(df[i18n("政策类型")].unique().to_list()),
-                ),
-                ui.input_select(
-                    "year",
-                    i18n("年份"),
-                    choices=[i18n("全部")]
-                    + sorted(df[i18n("时间")].str.slice(3, 4).unique().to_list(), reverse=True),
-                ),
-                ui.input_text(id="keyword", label=i18n("关键词"), placeholder=i18n("请输入关键词")),
-                ui.div(
-                    ui.div(
-                        "下载",
-                        class_="form-label",
-                        style="visibility: hidden; height: 1em;",
+def poll_dataset(lang: str):
+    @reactive.poll(lambda: data.version(lang), POLL_INTERVAL)
+    def dataset() -> data.Dataset:
+        return data.current(lang)
+
+    return dataset
+
+
+# one poll per language, shared by all of its sessions
+datasets = {lang: poll_dataset(lang) for lang in LANGUAGES}
+
+
+def build_ui(lang: str):
+    ds = initial[lang]
+    return ui.page_fluid(
+        ui.head_content(
+            ui.tags.link(rel="stylesheet", href=asset_url("app.css")),
+            ui.tags.link(rel="stylesheet", href=asset_url("table.css")),
+            ui.tags.link(rel="stylesheet", href=asset_url("detail.css")),
+            ui.tags.script(src=asset_url("table.js")),
+        ),
+        ui.navset_hidden(
+            ui.nav_panel(
+                "tabview",
+                ui.layout_columns(
+                    ui.input_select(
+                        "region",
+                        i18n("经济体", lang=lang),
+                        choices=[i18n("全部", lang=lang)] + ds.all_regions,
+                    ),
+                    ui.input_select(
+                        "type",
+                        i18n("政策类型", lang=lang),
+                        choices=[i18n("全部", lang=lang)] + ds.types,
                     ),
-                    ui.input_action_button(
-                        "download",
-                        "",
-                        class_="download-icon",
-                        icon=ui.tags.svg(
-                            {
-                                "xmlns": "http://www.w3.org/2000/svg",
-                                "viewBox": "0 0 24 24",
-                                "fill": "currentColor",
-                                "height": "20",
-                                "width": "20",
-                            },
-                            Tag(
-                                "path",
-                                d="M5 20h14v-2H5v2zm7-18v12l5-5h-3V4h-4v5H7l5 5V2z",
+                    ui.input_select(
+                        "year",
+                        i18n("年份", lang=lang),
+                        choices=[i18n("全部", lang=lang)] + ds.years,
+                    ),
+                    ui.input_text(id="keyword", label=i18n("关键词", lang=lang), placeholder=i18n("请输入关键词", lang=lang)),
+                    ui.div(
+                        ui.div(
+                            "下载",
+                            class_="form-label",
+                            style="visibility: hidden; height: 1em;",
+                        ),
+                        ui.input_action_button(
+                            "download",
+                            "",
+                            class_="download-icon",
+                            data_tooltip=i18n("下载结果", lang=lang),
+                            icon=ui.tags.svg(
+                                {
+                                    "xmlns": "http://www.w3.org/2000/svg",
+                                    "viewBox": "0 0 24 24",
+                                    "fill": "currentColor",
+                                    "height": "20",
+                                    "width": "20",
+                                },
+                                Tag(
+                                    "path",
+                                    d="M5 20h14v-2H5v2zm7-18v12l5-5h-3V4h-4v5H7l5 5V2z",
+                                ),
                             ),
                         ),
+                        class_="col-sm-2",  # mimic layout_columns spacing
+                        style="display: flex; flex-direction: column; align-items: start; justify-content: end; padding-top: 0.6em;",
                     ),
-                    class_="col-sm-2",  # mimic layout_columns spacing
-                    style="display: flex; flex-direction: column; align-items: start; justify-content: end; padding-top: 0.6em;",
                 ),
-            ),
-            ui.tags.style(f"""
-                th, td {{
-                    text-align: left;
-                }}
-                .download-icon {{
-                    background-color: white;
-                    border: 1px solid #ccc;
-                    padding: 6px 12px;
-                    border-radius: 8px;
-                    cursor: pointer;
-                    display: inline-flex;
-                    align-items: center;
-                    justify-content: center;
-                    transition: background-color 0.2s;
-                    position: relative;
-                }}
-                .download-icon:hover {{
-                    background-color: #f0f0f0;
-                }}
-                .download-icon:hover::after {{
-                    content: '{i18n("下载结果")}';
-                    position: absolute;
-                    bottom: -2em;
-                    background-color: #bbb;
-                    color: black;
-                    font-size: 12px;
-                    padding: 4px 8px;
-                    border-radius: 4px;
-                    white-space: nowrap;
-                }}
-
-                .download-icon svg {{
-                    width: 20px;
-                    height: 20px;
-                    fill: #333;
-                }}
-                
-                .detail-buttons {{
-                    display: flex;
-                    gap: 1em;
-                    margin-top: 1em;
-                }}
-
-                .detail-buttons a,
-                .detail-buttons button {{
-                    padding: 0.75em 2em;
-                    font-size: 1em;
-                    border: none;
-                    border-radius: 999px;
-                    cursor: pointer;
-                    text-decoration: none;
-                    color: white;
-                    background-color: rgb(13, 97, 72);
-                    transition: background-color 0.3s;
-                }}
-
-                .detail-buttons a:hover,
-                .detail-buttons button:hover {{
-                    color: white;
-                    background-color: rgb(11, 82, 61);
-                }}
-            """),
-            ui.navset_hidden(
-                ui.nav_panel(
-                    "table_panel",
-                    ui.output_ui(id="table_ui"),
+                ui.navset_hidden(
+                    ui.nav_panel(
+                        "table_panel",
+                        ui.output_ui(id="table_ui"),
+                    ),
+                    download_tab(lang),
+                    id = "table_download",
                 ),
-                download_tab,
-                id = "table_download",
             ),
+            ui.nav_panel("detail_view", ui.output_ui("detail_ui")),
+            id="view",
         ),
-        ui.nav_panel("detail_view", ui.output_ui("detail_ui")),
-        id="view",
+        # tells the session which language this page was served in
+        ui.div(ui.input_text("lang", None, value=lang), style="display: none;"),
     )
-)
+
+
+# the UI tree of every language is built once; each request picks one
+UI = {lang: build_ui(lang) for lang in LANGUAGES}
+
+
+def request_lang(request: Request) -> str:
+    return negotiate(request.query_params.get("lang"), request.headers.get("accept-language"))
+
+
+def app_ui(request: Request):
+    return UI[request_lang(request)]
 
 
 def server(input, output, session):
+    metrics.inc("mgf_sessions_total")
+    metrics.add_gauge("mgf_active_sessions", 1)
+    session.on_ended(lambda: metrics.add_gauge("mgf_active_sessions", -1))
+
+    # the language the page was served in, fixed for the session
+    with reactive.isolate():
+        lang = negotiate(
+            input.lang() if "lang" in input else None,
+            session.http_conn.headers.get("accept-language"),
+        )
+    dataset = datasets[lang]
+    everything = i18n("全部", lang=lang)
+
     current_page = reactive.value(1)
     focused_policy = reactive.value(None)
+    # one search per pause in typing rather than one per keystroke
+    keyword = debounce(KEYWORD_DEBOUNCE, input.keyword)
+
+    @reactive.Calc
+    def filters() -> dict:
+        return dict(
+            region=None if input.region() == everything else input.region(),
+            type=None if input.type() == everything else input.type(),
+            year=None if input.year() == everything else input.year(),
+            keyword=keyword(),
+        )
 
     @reactive.Calc
-    def filtered():
+    def rows() -> pl.Series:
+        ds = dataset()
+        with span("filter") as s:
+            result = filter_rows(ds, **filters())
+            s["rows_in"], s["rows_out"] = ds.df.height, len(result)
+        return result
+
+    @reactive.effect(priority=1)
+    def _():
+        # back to the first page whenever the filters or data change
+        dataset()
+        filters()
         current_page.set(1)
-        data = df
-        if input.region() != i18n("全部"):
-            data = data.filter(pl.col(i18n("经济体")).str.contains(input.region()))
-        if input.type() != i18n("全部"):
-            data = data.filter(pl.col(i18n("政策类型")) == input.type())
-        if input.year() != i18n("全部"):
-            data = data.filter(pl.col(i18n("时间")).cast(str).str.slice(3, 4) == input.year())
-        if input.keyword():
-            keyword: str = input.keyword().lower().strip()
-            if keyword:
-                string_cols = [
-                    col for col, dtype in data.schema.items() if dtype == pl.String
-                ]
-
-                if string_cols:
-                    filter_expr = pl.fold(
-                        acc=pl.lit(False),
-                        exprs=[
-                            pl.col(col).str.to_lowercase().str.contains(keyword)
-                            for col in string_cols
-                        ],
-                        function=lambda acc, expr: acc | expr,
-                    )
-                    data = data.filter(filter_expr)
 
-        return data
+    @reactive.Calc
+    def filtered() -> pl.DataFrame:
+        with span("filtered") as s:
+            df = dataset().df[rows()]
+            s["rows_out"] = df.height
+        return df
+
+    @reactive.effect
+    def _():
+        # Refresh the select choices when a new snapshot is swapped in
+        ds = dataset()
+        if ds.version == initial[lang].version:
+            return
+        with reactive.isolate():
+            for select_id, choices in (
+                ("region", ds.all_regions),
+                ("type", ds.types),
+                ("year", ds.years),
+            ):
+                selected = input[select_id]()
+                choices = [everything] + choices
+                ui.update_select(
+                    select_id,
+                    choices=choices,
+                    selected=selected if selected in choices else everything,
+                )
+
+    @reactive.effect
+    async def _():
+        # label each select option with its row count under the other filters;
+        # table.js disables the options that would leave nothing
+        with span("facets"):
+            counts = facet_counts(dataset(), **filters())
+        await session.send_custom_message("mgf-facets", counts)
 
     @output
     @render.ui  # table
     def table_ui():
-        # Rearrange and format data
-        data: pl.DataFrame = (
-            filtered()
-            .select(([i18n("经济体"), i18n("政策动态"), i18n("政策类型"), i18n("发布主体"), i18n("时间")]))
-            .with_columns(
-                pl.col(i18n("时间"))
-                .str.strptime(pl.Date, "%m/%Y", strict=False)
-                .dt.strftime("%Y-%m")
-            )
-        )
-        try:
-            table: Tag = output_paginated_table("mytable", data, page=current_page())
-            return table
-        except Exception as e:
-            print("⚠️ Error rendering table:", e)
-            return ui.markdown(f"**Error rendering table:** `{e}`")
+        ds = dataset()
+        client_side = CLIENT_PAGINATION and rows().len() <= CLIENT_PAGINATION_MAX_ROWS
+        # in client-side mode the browser pages, so the page is not a dependency
+        page = 1 if client_side else current_page()
+        key = (filter_key(ds, **filters()), page, PER_PAGE, lang)
+        with span("table_ui") as s:
+            # a client-side table holds the whole result, too big to keep per filter
+            html = None if client_side else page_cache.get(key)
+            s["cache"] = "off" if client_side else "miss" if html is None else "hit"
+            if html is None:
+                try:
+                    # display-ready columns are precomputed per data load
+                    table: Tag = output_paginated_table(
+                        "mytable",
+                        ds.table,
+                        page=page,
+                        per_page=PER_PAGE,
+                        rows=rows(),
+                        client_side=client_side,
+                        id_column=data.ROW_ID,
+                        href=f"policy/{{}}?lang={lang.lower()}",
+                        lang=lang,
+                    )
+                except Exception as e:
+                    print("⚠️ Error rendering table:", e)
+                    metrics.inc("mgf_span_errors_total", span="table_ui")
+                    return ui.markdown(f"**Error rendering table:** `{e}`")
+                html = ui.HTML(str(table))
+                if not client_side:
+                    page_cache.put(key, html)
+            s["bytes"] = len(html)
+        return html
 
     @output
     @render.ui
     def detail_ui():
-        if not focused_policy():
-            return ui.markdown(i18n("⚠️ 未找到政策详情。"))
-        row = df.filter(pl.col(i18n("政策动态")) == focused_policy())
-        return render_detail(row)
+        ds = dataset()
+        position = ds.position(focused_policy())
+        if position is None:
+            return ui.markdown(i18n("⚠️ 未找到政策详情。", lang=lang))
+        key = (ds.sha, focused_policy(), lang)
+        with span("detail_ui") as s:
+            html = detail_cache.get(key)
+            s["cache"] = "miss" if html is None else "hit"
+            if html is None:
+                html = ui.HTML(str(render_detail(
+                    ds.df[position : position + 1],
+                    permalink=f"policy/{quote(focused_policy())}?lang={lang.lower()}",
+                    lang=lang,
+                )))
+                detail_cache.put(key, html)
+            s["bytes"] = len(html)
+        return html
 
     @reactive.effect
     @reactive.event(input.download)
@@ -242,30 +313,21 @@ def server(input, output, session):
 
     @render.text
     def nrow():
-        return i18n("将通过邮件当前筛选结果，共 {} 条记录", filtered().shape[0])
+        return i18n("将通过邮件当前筛选结果，共 {} 条记录", rows().len(), lang=lang)
 
     @reactive.effect
     @reactive.event(input.send_csv)
     async def _():
-        data_csv: str = filtered().write_csv(
-            include_bom=True,
-            separator=",",
-            quote_char='"',
-            quote_style="non_numeric",
-            null_value="",
-        )  # Returns as string
-        await send_to_email(input, session, "csv", data_csv)
+        await send_to_email(
+            input, session, "csv", filtered(), key=filter_key(dataset(), **filters()), lang=lang
+        )
 
     @reactive.effect
     @reactive.event(input.send_excel)
     async def _():
-        # Step 1: Write Excel to in-memory buffer
-        buffer = io.BytesIO()
-        filtered().write_excel(buffer)
-        buffer.seek(0)
-
-        # Step 2: Send Excel to email
-        await send_to_email(input, session, "xlsx", buffer.getvalue())
+        await send_to_email(
+            input, session, "xlsx", filtered(), key=filter_key(dataset(), **filters()), lang=lang
+        )
 
     @reactive.Effect
     def on_click():
@@ -276,7 +338,13 @@ def server(input, output, session):
     @reactive.effect
     @reactive.event(input.mytable_page)
     async def _():
-        current_page.set(input.mytable_page())
+        # the jump-to-page box can send anything; keep the page within the results
+        try:
+            page = int(input.mytable_page())
+        except (TypeError, ValueError):
+            return
+        total = max(math.ceil(rows().len() / PER_PAGE), 1)
+        current_page.set(min(max(page, 1), total))
 
     @reactive.effect
     @reactive.event(input.back)
@@ -288,4 +356,102 @@ def server(input, output, session):
     async def _():
         ui.update_navs("table_download", selected="table_panel")
 
-app = App(app_ui, server, debug=False)
+
+async def policy_page(request: Request) -> Response:
+    """Deep-linkable detail page that needs no websocket session."""
+    lang = request_lang(request)
+    policy_id: str = request.path_params["id"]
+    ds = data.current(lang)
+    position = ds.position(policy_id)
+    if position is None and "lang" not in request.query_params:
+        # ids hash each language's own rows, so a link shared from the other
+        # language only resolves there
+        for other in LANGUAGES:
+            if other == lang:
+                continue
+            other_ds = data.current(other)
+            found = other_ds.position(policy_id)
+            if found is not None:
+                lang, ds, position = other, other_ds, found
+                break
+    if position is None:
+        return HTMLResponse(i18n("⚠️ 未找到政策详情。", lang=lang), status_code=404)
+
+    headers = {
+        "ETag": f'"{ds.sha[:16]}-{policy_id}-{lang}"',
+        # pages can change whenever the data is refreshed
+        "Cache-Control": f"public, max-age={data.REFRESH_INTERVAL}",
+        # without ?lang=, the language follows the Accept-Language header
+        "Vary": "Accept-Language",
+    }
+    if request.headers.get("If-None-Match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    key = (ds.sha, policy_id, lang, "page")
+    with span("policy_page") as s:
+        html = detail_cache.get(key)
+        s["cache"] = "miss" if html is None else "hit"
+        if html is None:
+            html = ui.HTML(render_detail_page(ds.df[position : position + 1], lang=lang))
+            detail_cache.put(key, html)
+        s["bytes"] = len(html)
+    return HTMLResponse(str(html), headers=headers)
+
+
+async def metrics_page(request: Request) -> Response:
+    """Prometheus scrape endpoint; each worker reports its own series."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+async def export_download(request: Request) -> Response:
+    """An emailed export, behind an expiring signed token (see exports.export_token)."""
+    path = resolve_export(request.path_params["token"])
+    if path is None:
+        return Response(status_code=403)
+    try:
+        os.utime(path)  # keep linked exports from being evicted first
+    except OSError:
+        return Response(
+            i18n("⚠️ 下载链接已失效，请重新发送。", lang=request_lang(request)), status_code=410
+        )
+    fmt = export_format(path)
+    headers = {
+        "Cache-Control": "private, no-store",
+        "Content-Disposition": f'attachment; filename="MGF_dataset.{fmt}"',
+    }
+    media_type = EXPORT_MEDIA_TYPES.get(fmt)
+    if path.suffix != ".gz":
+        return FileResponse(path, media_type=media_type, headers=headers)
+    # cached gzipped: sent as is, or inflated on the fly for clients without gzip
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return FileResponse(
+            path, media_type=media_type, headers={**headers, "Content-Encoding": "gzip"}
+        )
+    return StreamingResponse(_inflate(path), media_type=media_type, headers=headers)
+
+
+def _inflate(path: Path) -> Iterator[bytes]:
+    with gzip.open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            yield chunk
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    # drain pooled keep-alive connections to the mailing endpoint
+    await mailer.aclose()
+
+
+shiny_app = App(app_ui, server, static_assets={STATIC_PREFIX: WWW_DIR}, debug=False)
+app = StaticCacheMiddleware(
+    Starlette(
+        routes=[
+            Route("/policy/{id}", policy_page),
+            Route("/export/{token}", export_download),
+            Route("/metrics", metrics_page),
+            Mount("/", app=shiny_app),
+        ],
+        lifespan=lifespan,
+    )
+)
@@ -0,0 +1,41 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+WWW_DIR = Path(__file__).parent / "www"
+STATIC_PREFIX = "/static"
+# Fingerprinted URLs always name the same bytes, so they can be cached for a year
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@lru_cache
+def asset_url(name: str) -> str:
+    """Relative URL of a file in www/, fingerprinted with its content hash."""
+    digest = hashlib.sha256((WWW_DIR / name).read_bytes()).hexdigest()[:12]
+    return f"{STATIC_PREFIX.lstrip('/')}/{name}?v={digest}"
+
+
+class StaticCacheMiddleware:
+    """Adds long-lived Cache-Control headers to fingerprinted static assets."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(STATIC_PREFIX + "/")
+            or b"v=" not in scope.get("query_string", b"")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_cached(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                MutableHeaders(scope=message)["Cache-Control"] = IMMUTABLE
+            await send(message)
+
+        await self.app(scope, receive, send_cached)
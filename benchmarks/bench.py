@@ -0,0 +1,218 @@
+"""
+Time the hot paths of the app on synthetic data and record the results as JSON.
+
+Covers building a snapshot and syncing it with an upstream update, filtering
+per filter type (cold, and from the filter cache), facet counts, table
+rendering, detail lookup and CSV/XLSX export, for each language and dataset
+size. Run from the repository root:
+
+    python -m benchmarks.bench --rows 1000 100000 1000000 --out bench.json
+    python -m benchmarks.bench --rows 1000 100000 --compare bench.json
+
+With --compare, cases that got slower than the baseline by more than
+--tolerance are listed and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def timed(fn: Callable[[], object], repeat: int) -> dict:
+    """Run `fn` `repeat` times and summarize the wall times in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def run_language(sizes: list[int], repeat: int, max_xlsx_rows: int) -> list[dict]:
+    """Benchmark every size in the language of this process (LANGUAGE)."""
+    import polars as pl
+
+    import data
+    from details import render_detail, render_detail_page
+    from exports import build_export
+    from i18n import LANG
+    from query import facet_cache, facet_counts, filter_cache, filter_rows
+    from table import output_paginated_table
+
+    from benchmarks.synthetic import WORDS, make
+
+    # xlsxwriter warns once per link beyond Excel's 65,530 URLs per sheet
+    warnings.filterwarnings("ignore", message="Ignoring URL")
+    results = []
+
+    def record(rows: int, case: str, stats: dict, **extra):
+        results.append({"lang": LANG, "rows": rows, "case": case, **stats, **extra})
+        print(f"{LANG} {rows:>9} {case:<24} {stats['median_ms']:>10.2f} ms", file=sys.stderr)
+
+    for size in sizes:
+        raw = make(size)
+        frames = {}
+
+        def build():
+            frames["ds"] = data.derive(data.process(raw), sha="bench", etag=None, version=1)
+
+        record(size, "snapshot.build", timed(build, 1))
+        ds: data.Dataset = frames["ds"]
+
+        # an upstream update replacing the oldest 1% of the rows with new ones
+        update = pl.concat([raw.slice(size // 100), make(size // 100, seed=1)])
+        record(size, "snapshot.sync", timed(lambda: data.sync(ds.frames, update), 1), changed=size // 50)
+
+        region = ds.all_regions[len(ds.all_regions) // 2]
+        year = ds.years[len(ds.years) // 2]
+        cases = {
+            "all": {},
+            "region": {"region": region},
+            "type": {"type": ds.types[0]},
+            "year": {"year": year},
+            "keyword": {"keyword": WORDS[0]},
+            "keyword.short": {"keyword": WORDS[1][:1]},
+            "keyword.miss": {"keyword": "no such policy"},
+            "combined": {"region": region, "type": ds.types[0], "year": year, "keyword": WORDS[0]},
+        }
+        for name, filters in cases.items():
+            out = {}
+
+            def cold():
+                filter_cache.clear()
+                out["df"] = ds.df[filter_rows(ds, **filters)]
+
+            stats = timed(cold, repeat)
+            record(size, f"filter.{name}", stats, rows_out=out["df"].height)
+        record(size, "filter.cached", timed(lambda: filter_rows(ds, **cases["combined"]), repeat))
+
+        for name in ("all", "region", "combined"):
+            def facets():
+                facet_cache.clear()
+                facet_counts(ds, **cases[name])
+
+            record(size, f"facets.{name}", timed(facets, repeat))
+
+        everything = filter_rows(ds)
+        last = max(1, -(-len(everything) // 10))
+        for name, kwargs in {
+            "first": {"page": 1},
+            "last": {"page": last},
+            "client": {"per_page": 10, "client_side": True},
+        }.items():
+            render = lambda: str(output_paginated_table(
+                "bench", ds.table, rows=everything, id_column=data.ROW_ID, **kwargs
+            ))
+            record(size, f"render.{name}", timed(render, repeat), bytes=len(render()))
+
+        ids = ds.ids.gather([0, size // 2, size - 1]).to_list()
+
+        def detail():
+            for id in ids:
+                position = ds.position(id)
+                str(render_detail(ds.df[position : position + 1]))
+
+        def detail_page():
+            for id in ids:
+                position = ds.position(id)
+                render_detail_page(ds.df[position : position + 1])
+
+        record(size, "detail.view", timed(detail, repeat), lookups=len(ids))
+        record(size, "detail.page", timed(detail_page, repeat), lookups=len(ids))
+
+        for fmt in ("csv", "xlsx"):
+            if fmt == "xlsx" and size > max_xlsx_rows:
+                continue
+            out = {}
+
+            def export():
+                out["bytes"] = len(build_export(ds.df, fmt))
+
+            stats = timed(export, 1 if size > 100_000 else repeat)
+            record(size, f"export.{fmt}", stats, bytes=out["bytes"])
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Describe every case slower than its baseline by more than `tolerance`."""
+    before = {(r["lang"], r["rows"], r["case"]): r["median_ms"] for r in baseline}
+    slower = []
+    for r in results:
+        old = before.get((r["lang"], r["rows"], r["case"]))
+        if old and r["median_ms"] > old * (1 + tolerance):
+            slower.append(
+                f"{r['lang']} {r['rows']} {r['case']}: {old:.2f} -> {r['median_ms']:.2f} ms"
+            )
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--langs", nargs="+", default=["CN", "EN"], choices=["CN", "EN"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-xlsx-rows", type=int, default=100_000, help="skip XLSX exports above this size")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # each language runs in its own process, so one language never warms the caches of the other
+        json.dump(run_language(args.rows, args.repeat, args.max_xlsx_rows), sys.stdout)
+        return
+
+    results = []
+    for lang in args.langs:
+        worker = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench", "--worker",
+             "--rows", *map(str, args.rows), "--repeat", str(args.repeat),
+             "--max-xlsx-rows", str(args.max_xlsx_rows)],
+            cwd=ROOT,
+            env={**os.environ, "LANGUAGE": lang},
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        results += json.loads(worker.stdout)
+
+    import polars as pl
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "polars": pl.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        slower = compare(results, baseline, args.tolerance)
+        for line in slower:
+            print("slower:", line)
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Headless load driver: simulates concurrent users of a running app.
+
+Each simulated user opens a Shiny websocket session and keeps changing
+filters, paging and opening policy details, timing every action from the
+input update until the server reports it is idle again. Keyword updates are
+filtered only once the server's KEYWORD_DEBOUNCE has passed, so they are
+timed until no more work follows within --debounce (pass the server's value)
+and include that delay, as a typing user would see. Serve a synthetic
+dataset (see benchmarks/synthetic.py), then for example:
+
+    python -m benchmarks.load --url http://localhost:8000 --sessions 50 --duration 60 --out load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+
+import httpx
+import websockets
+
+# Outputs only render while the client reports them visible
+OUTPUTS = ("table_ui", "detail_ui", "nrow")
+POLICY_ID = re.compile(r'setInputValue\(&quot;mytable&quot;, &quot;([\w-]+)&quot;')
+
+
+class SelectOptions(HTMLParser):
+    """Collects the option values of every <select> on the page."""
+
+    def __init__(self):
+        super().__init__()
+        self.options: dict[str, list[str]] = {}
+        self._select: str | None = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "select":
+            self._select = attrs.get("id")
+            self.options[self._select] = []
+        elif tag == "option" and self._select is not None:
+            self.options[self._select].append(attrs.get("value", ""))
+
+    def handle_endtag(self, tag):
+        if tag == "select":
+            self._select = None
+
+
+class User:
+    def __init__(
+        self,
+        url: str,
+        lang: str,
+        options: dict[str, list[str]],
+        think: float,
+        timeout: float,
+        rng: random.Random,
+        debounce: float = 0.0,
+    ):
+        self.ws_url = re.sub(r"^http", "ws", url.rstrip("/")) + "/websocket/"
+        self.lang = lang
+        self.options = options
+        self.think = think
+        self.timeout = timeout
+        self.rng = rng
+        self.debounce = debounce
+        self.page = 1
+        self.policy_ids: list[str] = []
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def _note(self, messages: list[dict]):
+        for message in messages:
+            html = message.get("values", {}).get("table_ui")
+            if isinstance(html, dict):
+                self.policy_ids = POLICY_ID.findall(html.get("html", "")) or self.policy_ids
+
+    async def _until_idle(self, ws) -> list[dict]:
+        messages = []
+        while True:
+            message = json.loads(await asyncio.wait_for(ws.recv(), self.timeout))
+            messages.append(message)
+            if message.get("busy") == "idle":
+                return messages
+
+    async def _until_settled(self, ws, quiet: float) -> tuple[list[dict], float]:
+        """
+        Like _until_idle(), but also wait out work that starts within `quiet`
+        seconds of going idle, such as the debounced keyword filter, so it is
+        not counted against the next action. Returns the messages and when
+        the server last went idle.
+        """
+        messages = await self._until_idle(ws)
+        idle = time.perf_counter()
+        while True:
+            try:
+                message = json.loads(await asyncio.wait_for(ws.recv(), quiet))
+            except asyncio.TimeoutError:
+                return messages, idle
+            messages.append(message)
+            if message.get("busy") == "busy":
+                messages += await self._until_idle(ws)
+                idle = time.perf_counter()
+
+    def _action(self) -> tuple[str, dict]:
+        options, rng = self.options, self.rng
+        choice = rng.choice(["region", "type", "year", "keyword", "page", "detail"])
+        if choice == "keyword":
+            return choice, {"keyword": rng.choice(["", "", "climate", "绿色", "carbon", "气候", "risk"])}
+        if choice == "page":
+            self.page = self.page + 1 if self.page < 5 else 1
+            return choice, {"mytable_page": self.page}
+        if choice == "detail" and self.policy_ids:
+            return choice, {"mytable": rng.choice(self.policy_ids)}
+        name = choice if choice != "detail" else "region"
+        return name, {name: rng.choice(options.get(name) or [""])}
+
+    async def run(self, deadline: float):
+        init = {
+            "region": self.options["region"][0],
+            "type": self.options["type"][0],
+            "year": self.options["year"][0],
+            "keyword": "",
+            "lang": self.lang,
+            "user_email": "",
+            "user_inst": "",
+            ".clientdata_url_search": "",
+            ".clientdata_url_pathname": "/",
+            **{f".clientdata_output_{output}_hidden": False for output in OUTPUTS},
+        }
+        try:
+            async with websockets.connect(self.ws_url, max_size=None) as ws:
+                start = time.perf_counter()
+                await ws.send(json.dumps({"method": "init", "data": init}))
+                self._note(await self._until_idle(ws))
+                self.latencies.setdefault("init", []).append(time.perf_counter() - start)
+
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think) if self.think else 0)
+                    name, update = self._action()
+                    start = time.perf_counter()
+                    await ws.send(json.dumps({"method": "update", "data": update}))
+                    try:
+                        if name == "keyword" and self.debounce > 0:
+                            # the debounced filter starts about `debounce` seconds after the first idle
+                            messages, end = await self._until_settled(ws, self.debounce + 0.25)
+                        else:
+                            messages = await self._until_idle(ws)
+                            end = time.perf_counter()
+                        self._note(messages)
+                    except asyncio.TimeoutError:
+                        self.errors["timeout"] = self.errors.get("timeout", 0) + 1
+                        continue
+                    self.latencies.setdefault(name, []).append(end - start)
+        except (OSError, websockets.WebSocketException) as e:
+            key = type(e).__name__
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def summarize(latencies: list[float]) -> dict:
+    ms = sorted(x * 1000 for x in latencies)
+
+    def percentile(p: float) -> float:
+        return round(ms[min(len(ms) - 1, int(p * len(ms)))], 2)
+
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 2),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ms[-1], 2),
+    }
+
+
+async def drive(
+    url: str,
+    lang: str,
+    sessions: int,
+    duration: float,
+    ramp: float,
+    think: float,
+    timeout: float,
+    seed: int,
+    debounce: float = 0.0,
+) -> dict:
+    page = httpx.get(url, params={"lang": lang}, timeout=30)
+    page.raise_for_status()
+    parser = SelectOptions()
+    parser.feed(page.text)
+
+    deadline = time.monotonic() + ramp + duration
+    users = [
+        User(url, lang, parser.options, think, timeout, random.Random(seed + i), debounce)
+        for i in range(sessions)
+    ]
+
+    async def start(i: int, user: User):
+        await asyncio.sleep(ramp * i / max(1, sessions))
+        await user.run(deadline)
+
+    await asyncio.gather(*(start(i, user) for i, user in enumerate(users)))
+
+    by_action: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    for user in users:
+        for name, values in user.latencies.items():
+            by_action.setdefault(name, []).extend(values)
+        for name, count in user.errors.items():
+            errors[name] = errors.get(name, 0) + count
+    actions = sum(len(v) for name, v in by_action.items() if name != "init")
+    return {
+        "meta": {
+            "url": url,
+            "lang": lang,
+            "sessions": sessions,
+            "duration_s": duration,
+            "think_s": think,
+            "debounce_s": debounce,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "throughput_per_s": round(actions / duration, 2),
+        "errors": errors,
+        "actions": {name: summarize(values) for name, values in sorted(by_action.items())},
+        "overall": summarize([x for name, v in by_action.items() if name != "init" for x in v])
+        if actions else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--lang", default="CN", choices=["CN", "EN"])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which sessions connect")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between a user's actions")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--debounce", type=float, default=0.3, help="the server's KEYWORD_DEBOUNCE, in seconds (0 if disabled)"
+    )
+    parser.add_argument("--out", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(drive(
+        args.url, args.lang, args.sessions, args.duration, args.ramp, args.think, args.timeout, args.seed,
+        args.debounce,
+    ))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Synthetic datasets in the schema of the upstream CSV, for benchmarks.
+
+Column names and the region separator go through i18n, so LANGUAGE picks the
+CN or EN schema exactly as it does for the app. To serve a synthetic dataset
+without a GitHub token, seed a snapshot and point the app at it:
+
+    LANGUAGE=CN python -m benchmarks.synthetic --rows 100000 --cache-dir /tmp/mgf-bench
+    CACHE_DIR=/tmp/mgf-bench REFRESH_INTERVAL=86400 shiny run app.py
+"""
+
+import argparse
+import os
+
+import polars as pl
+
+from i18n import i18n, LANG
+
+if LANG == "CN":
+    WORDS = ["绿色金融", "气候", "碳排放", "信息披露", "转型", "监管", "央行", "债券", "风险", "标准", "保险", "能源"]
+    TYPES = ["货币政策", "监管政策", "信息披露", "财政政策", "产业政策", "国际合作", "标准制定", "其他"]
+    REGIONS = [f"经济体{i}" for i in range(40)] + ["中国", "美国", "欧盟", "日本", "英国", "中国香港"]
+    PUBLISHER = "机构{}"
+else:
+    WORDS = ["green finance", "climate", "carbon", "disclosure", "transition", "supervision", "central bank", "bond", "risk", "taxonomy", "insurance", "energy"]
+    TYPES = ["Monetary", "Regulation", "Disclosure", "Fiscal", "Industrial", "Cooperation", "Standards", "Other"]
+    REGIONS = [f"Economy {i}" for i in range(40)] + ["China", "United States", "EU", "Japan", "UK", "Hong Kong, China"]
+    PUBLISHER = "Agency {}"
+
+
+def make(rows: int, seed: int = 0) -> pl.DataFrame:
+    """A deterministic raw frame of `rows` rows, as read from the upstream CSV."""
+    row = pl.col("row")
+
+    def number(k: int, salt: int) -> pl.Expr:
+        return (row.hash(seed * 101 + salt) % k).cast(pl.Int64)
+
+    def pick(values: list[str], salt: int) -> pl.Expr:
+        return pl.lit(pl.Series(values)).gather(number(len(values), salt))
+
+    return pl.DataFrame({"row": pl.int_range(rows, eager=True, dtype=pl.UInt64)}).select(
+        pl.concat_str([pick(WORDS, 1), pick(WORDS, 2), pick(WORDS, 3), row], separator=" ")
+        .alias(i18n("政策动态")),
+        pl.format("{}/{}", (number(12, 4) + 1).cast(pl.String).str.zfill(2), number(26, 5) + 2000)
+        .alias(i18n("时间")),
+        pick(TYPES, 6).alias(i18n("政策类型")),
+        # a third of the policies name two economies
+        pl.when(number(3, 7) == 0)
+        .then(pl.concat_str([pick(REGIONS, 8), pick(REGIONS, 9)], separator=i18n("；")))
+        .otherwise(pick(REGIONS, 8))
+        .alias(i18n("经济体")),
+        pl.format(PUBLISHER, number(200, 10)).alias(i18n("发布主体")),
+        pl.concat_str([pick(WORDS, 11), pick(WORDS, 12)], separator=i18n("；")).alias(i18n("关键词")),
+        pl.format("https://example.org/policy/{}", row).alias(i18n("原文链接")),
+        pl.concat_str([pick(WORDS, salt) for salt in range(13, 33)], separator=" ").alias(i18n("内容简介")),
+        pl.format("https://example.org/news/{}", row).alias(i18n("新闻链接")),
+        pl.lit(None, dtype=pl.String).alias(i18n("备注")),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", required=True, help="snapshot directory to seed (the app's CACHE_DIR)")
+    args = parser.parse_args()
+
+    # data reads CACHE_DIR on import
+    os.environ["CACHE_DIR"] = args.cache_dir
+    import data
+
+    raw = make(args.rows, args.seed)
+    content = raw.write_csv().encode()
+    data.save_snapshot(data.process(raw), data.blob_sha(content), etag=None)
+    print(f"Seeded {args.rows} {LANG} rows into {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+from shiny import reactive
+
+T = TypeVar("T")
+
+
+def debounce(delay: float, source: Callable[[], T]) -> Callable[[], T]:
+    """
+    A reactive calc that follows `source` only once it has stopped changing
+    for `delay` seconds, so a burst of changes (e.g. keystrokes) causes one
+    downstream update. Intermediate values are never seen downstream, so no
+    work is spent on them. Must be called inside a server function.
+    """
+    if delay <= 0:
+        return source
+
+    with reactive.isolate():
+        settled = reactive.value(source())
+    deadline = reactive.value(0.0)
+
+    @reactive.effect
+    def _():
+        source()
+        deadline.set(time.monotonic() + delay)
+
+    @reactive.effect
+    def _():
+        remaining = deadline() - time.monotonic()
+        if remaining > 0:
+            # cancelled if the deadline moves again first
+            reactive.invalidate_later(remaining)
+            return
+        with reactive.isolate():
+            settled.set(source())
+
+    @reactive.calc
+    def debounced() -> T:
+        return settled()
+
+    return debounced
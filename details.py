@@ -1,51 +1,25 @@
 import polars as pl
 from shiny import ui
+from htmltools import tags
 from htmltools._core import Tag, HTML
 
-from i18n import i18n
+from assets import asset_url
+from i18n import i18n, LANG
 
 
-def render_detail(row: pl.DataFrame) -> Tag | HTML:
+def render_detail(
+    row: pl.DataFrame, back: Tag | None = None, permalink: str | None = None, lang: str = LANG
+) -> Tag | HTML:
+    """
+    `back` replaces the in-app "return to list" button, e.g. with a plain link.
+    `permalink`, the URL of the policy's own page, adds a button to share it.
+    """
     if row.is_empty():
         return ui.markdown("### ⚠️ Policy not found")
 
     r = row.row(0)
 
     return ui.div(
-        ui.tags.style("""
-            .detail-title {
-                font-size: 2rem;
-                font-weight: bold;
-                margin-bottom: 1em;
-            }
-
-            .detail-meta {
-                display: flex;
-                background-color: #f9f9f9;
-                padding: 1em;
-                border-radius: 0.5em;
-                margin-bottom: 1.5em;
-                font-size: 1rem;
-            }
-
-            .meta-item {
-                flex: 1;
-                padding: 0 1em;
-            }
-
-            .meta-label {
-                font-weight: bold;
-                color: #333;
-                margin-bottom: 0.2em;
-            }
-
-            .detail-text {
-                font-size: 1.25rem;
-                line-height: 1.8;
-                white-space: pre-wrap;
-                margin-bottom: 2em;
-            }
-        """),
         ui.div(r[0], class_="detail-title"),
         ui.div(
             *[
@@ -53,24 +27,52 @@ def render_detail(row: pl.DataFrame) -> Tag | HTML:
                     ui.div(label, class_="meta-label"),
                     value,
                     class_="meta-item",
-                    style=("border-right: 1px solid #aaa;" if i < 4 else ""),
-                )
-                for i, (label, value) in enumerate(
-                    [
-                        (i18n("经济体"), r[3]),
-                        (i18n("时间"), r[1]),
-                        (i18n("政策类型"), r[2]),
-                        (i18n("发布主体"), r[4]),
-                        (i18n("关键词"), r[5] if r[5] else ""),
-                    ]
                 )
+                for label, value in [
+                    (i18n("经济体", lang=lang), r[3]),
+                    (i18n("时间", lang=lang), r[1]),
+                    (i18n("政策类型", lang=lang), r[2]),
+                    (i18n("发布主体", lang=lang), r[4]),
+                    (i18n("关键词", lang=lang), r[5] if r[5] else ""),
+                ]
             ],
             class_="detail-meta",
         ),
-        ui.div(r[7] if len(r) > 7 else i18n("暂无详细描述内容。"), class_="detail-text"),
+        ui.div(r[7] if len(r) > 7 else i18n("暂无详细描述内容。", lang=lang), class_="detail-text"),
         ui.div(
-            ui.input_action_button("back", i18n("返回列表"), class_="btn"),
-            ui.a(i18n("详情链接"), href=r[6], target="_blank", class_="btn"),
+            back or ui.input_action_button("back", i18n("返回列表", lang=lang), class_="btn"),
+            ui.a(i18n("详情链接", lang=lang), href=r[6], target="_blank", class_="btn"),
+            ui.a(i18n("分享链接", lang=lang), href=permalink, target="_blank", class_="btn")
+            if permalink
+            else None,
             class_="detail-buttons",
         ),
     )
+
+
+def render_detail_page(row: pl.DataFrame, lang: str = LANG) -> str:
+    """A standalone HTML page for one policy, served outside of Shiny sessions."""
+    r = row.row(0)
+    page = tags.html(
+        tags.head(
+            tags.meta(charset="utf-8"),
+            tags.meta(name="viewport", content="width=device-width, initial-scale=1"),
+            tags.title(r[0]),
+            # served from /policy/<id>, one level below the app root
+            tags.link(rel="stylesheet", href="../" + asset_url("app.css")),
+            tags.link(rel="stylesheet", href="../" + asset_url("detail.css")),
+        ),
+        tags.body(
+            tags.div(
+                render_detail(
+                    row,
+                    # keep the language of the page when returning to the app
+                    back=ui.a(i18n("返回列表", lang=lang), href=f"../?lang={lang.lower()}", class_="btn"),
+                    lang=lang,
+                ),
+                style="max-width: 1200px; margin: 2em auto; padding: 0 1em;",
+            )
+        ),
+        lang="zh" if lang == "CN" else "en",
+    )
+    return "<!DOCTYPE html>\n" + str(page)
@@ -1,71 +1,64 @@
 
-from httpx._models import Response
-
 from shiny import ui
+import asyncio
 import os
-import httpx
-import base64
 import re
+import httpx
+import polars as pl
 
+from assets import asset_url
+from exports import EXPORT_SECRET, export_path, export_pool, export_token, generate_export
 from i18n import i18n, LANG
+from mailer import MailerBusy, RateLimited, mailer
 
-GOOGLE_SCRIPT_URL: str | None = os.getenv("GOOGLE_SCRIPT_URL")
-
-download_tab = ui.nav_panel(
+def download_tab(lang: str = LANG):
+    return ui.nav_panel(
                     "download_panel",
-                    ui.HTML(f"{i18n("请填写您的机构名称和邮箱，以便我们通过邮件发送所选数据：")}<br><br>"),
-                    ui.input_text("user_inst", i18n("机构名称:"), placeholder=i18n("请输入机构名称")),
-                    ui.input_text("user_email", i18n("邮箱:"), placeholder=i18n("请输入邮箱")),
+                    ui.HTML(f"{i18n("请填写您的机构名称和邮箱，以便我们通过邮件发送所选数据：", lang=lang)}<br><br>"),
+                    ui.input_text("user_inst", i18n("机构名称:", lang=lang), placeholder=i18n("请输入机构名称", lang=lang)),
+                    ui.input_text("user_email", i18n("邮箱:", lang=lang), placeholder=i18n("请输入邮箱", lang=lang)),
                     ui.output_text(id="nrow"),
                     ui.div(
                         ui.layout_columns(
-                            ui.input_action_button(id="send_csv", label=i18n("发送 CSV")),
-                            ui.input_action_button(id="send_excel", label=i18n("发送 Excel")),
-                            ui.input_action_button("back1", i18n("返回列表"))
+                            ui.input_action_button(id="send_csv", label=i18n("发送 CSV", lang=lang)),
+                            ui.input_action_button(id="send_excel", label=i18n("发送 Excel", lang=lang)),
+                            ui.input_action_button("back1", i18n("返回列表", lang=lang))
                         ),
                         class_="detail-buttons",
                     ),
-                    ui.tags.script("""
-                    document.addEventListener("DOMContentLoaded", function() {
-                        const email = localStorage.getItem("user_email");
-                        const inst = localStorage.getItem("user_inst");
-                        if (email) {
-                            const emailInput = document.getElementById("user_email");
-                            if (emailInput) {
-                                emailInput.value = email; // update UI
-                                //Shiny.setInputValue("user_email", email); // update server input
-                            }
-                        }
-
-                        if (inst) {
-                            const instInput = document.getElementById("user_inst");
-                            if (instInput) {
-                                instInput.value = inst;
-                                //Shiny.setInputValue("user_inst", inst);
-                            }
-                        }
-                    });
-                    Shiny.addCustomMessageHandler("storeUserInfo", function(message) {
-                        localStorage.setItem("user_email", message.email);
-                        localStorage.setItem("user_inst", message.inst);
-                    });
-                    """)
+                    ui.tags.script(src=asset_url("download.js")),
                 )
 
 EMAIL_REGEX = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w{2,}$")
+# Exports larger than this are emailed as an expiring download link; 0 disables links
+MAIL_LINK_BYTES: int = int(float(os.getenv("MAIL_LINK_MB", "0")) * 1024 * 1024)
+# Public base URL for download links; unset disables them. Never taken from the
+# request, whose Host header the client controls.
+PUBLIC_URL: str = os.getenv("PUBLIC_URL", "")
+
 
-async def send_to_email(input, session, fmt: str, data: bytes | str):
+def export_link(key: tuple, fmt: str) -> tuple[str, int]:
+    """An expiring URL to the cached export, and its expiry as a unix timestamp."""
+    if not PUBLIC_URL:
+        raise ValueError("PUBLIC_URL environment variable is not set.")
+    token, expires = export_token(export_path(key, fmt))
+    return f"{PUBLIC_URL.rstrip('/')}/export/{token}", expires
+
+async def send_to_email(
+    input, session, fmt: str, df: pl.DataFrame, key: tuple | None = None, lang: str = LANG
+):
+    """`key` is the filter key of `df`, letting identical exports be reused."""
     email: str = input.user_email().strip()
     inst: str = input.user_inst().strip()
 
     # Validate email
     if not EMAIL_REGEX.match(email):
-        ui.notification_show(i18n("📮 无效的邮箱地址，请检查输入。"), type="error")
+        ui.notification_show(i18n("📮 无效的邮箱地址，请检查输入。", lang=lang), type="error")
         return
 
     # Validate institution (optional, but recommended)
     if len(inst) < 2:
-        ui.notification_show(i18n("🏢 请输入机构名称（至少两个字符）。"), type="error")
+        ui.notification_show(i18n("🏢 请输入机构名称（至少两个字符）。", lang=lang), type="error")
         return
 
     # Save info in browser localStorage
@@ -73,28 +66,47 @@ async def send_to_email(input, session, fmt: str, data: bytes | str):
         "email": email,
         "inst": inst
     })
-    
-    if fmt == "xlsx":
-        if not isinstance(data, bytes):
-            raise ValueError("Excel format requires binary data")
-        content_b64 = base64.b64encode(data).decode("utf-8")
-    else:
-        if not isinstance(data, str):
-            raise ValueError("CSV format requires string data")
-        content_b64 = base64.b64encode(data.encode("utf-8")).decode("utf-8")
 
-    payload = {
-        "email": email,
-        "inst": inst,
-        "format": fmt,
-        "lang": LANG,
-        "content": content_b64,
-    }
-    async with httpx.AsyncClient() as client:
-        if not GOOGLE_SCRIPT_URL:
-            raise ValueError("GOOGLE_SCRIPT_URL environment variable is not set.")
-        response: Response =  await client.post(GOOGLE_SCRIPT_URL, json=payload)
-        if response.status_code == 302:
-            _ = ui.notification_show(i18n("📬 数据已发送至邮箱"), type="message")
+    try:
+        mailer.reserve(email)
+    except RateLimited as e:
+        ui.notification_show(i18n("⏱️ 请在 {} 秒后再次发送到此邮箱。", round(e.retry_after), lang=lang), type="warning")
+        return
+    except MailerBusy:
+        ui.notification_show(i18n("⏳ 发送请求过多，请稍后再试。", lang=lang), type="warning")
+        return
+
+    progress = ui.notification_show(i18n("⏳ 正在生成导出文件……", lang=lang), duration=None)
+    try:
+        # the gzip transport posts the gzipped export, which the cache may already hold
+        content: bytes = await generate_export(df, fmt, key, gzipped=mailer.transport == "gzip")
+        fields = {"email": email, "inst": inst, "format": fmt, "lang": lang}
+        if (
+            key is not None
+            and EXPORT_SECRET
+            and PUBLIC_URL
+            and MAIL_LINK_BYTES
+            and len(content) > MAIL_LINK_BYTES
+            and export_path(key, fmt).exists()
+        ):
+            url, expires = export_link(key, fmt)
+            payloads = [({**fields, "url": url, "expires": expires}, None)]
         else:
-            _ = ui.notification_show(i18n("❌ 数据发送失败: {}", response), type="error")
\ No newline at end of file
+            loop = asyncio.get_running_loop()
+            payloads = await loop.run_in_executor(export_pool, mailer.parts, fields, content)
+        for payload, part in payloads:
+            response = await mailer.send(payload, part)
+            if response.status_code != 302:
+                break
+    except httpx.TransportError as e:
+        # the endpoint stayed unreachable through every retry
+        ui.notification_show(i18n("❌ 数据发送失败: {}", type(e).__name__, lang=lang), type="error")
+        return
+    finally:
+        mailer.release()
+        ui.notification_remove(progress)
+
+    if response.status_code == 302:
+        _ = ui.notification_show(i18n("📬 数据已发送至邮箱", lang=lang), type="message")
+    else:
+        _ = ui.notification_show(i18n("❌ 数据发送失败: {}", response, lang=lang), type="error")
@@ -0,0 +1,176 @@
+import asyncio
+import gzip
+import hashlib
+import hmac
+import io
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import polars as pl
+
+import data
+import metrics
+from query import filter_key
+
+# Exports are built off the event loop, at most this many at a time per worker
+EXPORT_WORKERS: int = int(os.getenv("EXPORT_WORKERS", "2"))
+export_pool = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+# Built exports, shared by every worker on the host
+EXPORT_CACHE_DIR: Path = data.CACHE_DIR / "exports"
+EXPORT_CACHE_BYTES: int = int(os.getenv("EXPORT_CACHE_MB", "256")) * 1024 * 1024
+EXPORT_FORMATS = ("csv", "xlsx")
+# Formats cached gzipped; XLSX files are zip archives already
+GZIP_FORMATS = ("csv",)
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Signs emailed download links; unset disables them
+EXPORT_SECRET: bytes = os.getenv("EXPORT_SECRET", "").encode()
+EXPORT_LINK_TTL: int = int(os.getenv("EXPORT_LINK_TTL", str(7 * 24 * 3600)))
+
+
+def build_export(df: pl.DataFrame, fmt: str) -> bytes:
+    if fmt == "csv":
+        return df.write_csv(
+            include_bom=True,
+            separator=",",
+            quote_char='"',
+            quote_style="non_numeric",
+            null_value="",
+        ).encode("utf-8")
+    if fmt == "xlsx":
+        buffer = io.BytesIO()
+        df.write_excel(buffer)
+        return buffer.getvalue()
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def export_path(key: tuple, fmt: str) -> Path:
+    """
+    Where the export for a filter key (see query.filter_key, which includes the
+    data SHA, so each language's data gets its own files) is cached, per format.
+    """
+    digest = hashlib.sha256(repr((key, fmt)).encode()).hexdigest()
+    return EXPORT_CACHE_DIR / (f"{digest}.{fmt}.gz" if fmt in GZIP_FORMATS else f"{digest}.{fmt}")
+
+
+def export_format(path: Path) -> str:
+    """The format of a cached export file, e.g. "csv" for "<digest>.csv.gz"."""
+    return path.name.split(".")[1]
+
+
+def cached_export(
+    df: pl.DataFrame, fmt: str, key: tuple | None = None, gzipped: bool = False
+) -> bytes:
+    """
+    The export of `df`, as a gzip stream if `gzipped`. With a filter `key` it
+    is reused from and stored in the disk cache, where GZIP_FORMATS are kept
+    gzipped, so their compressed bytes are never rebuilt.
+    """
+    stored_gzipped = key is not None and fmt in GZIP_FORMATS
+    content = None
+    if key is not None:
+        path = export_path(key, fmt)
+        try:
+            content = path.read_bytes()
+            path.touch()  # mtime doubles as the LRU clock
+            metrics.inc("mgf_export_cache_total", result="hit", format=fmt)
+        except OSError:
+            metrics.inc("mgf_export_cache_total", result="miss", format=fmt)
+
+    if content is None:
+        content = build_export(df, fmt)
+        if stored_gzipped:
+            content = gzip.compress(content, compresslevel=6)
+        if key is not None:
+            _store(path, content)
+
+    if gzipped and not stored_gzipped:
+        return gzip.compress(content, compresslevel=6)
+    if stored_gzipped and not gzipped:
+        return gzip.decompress(content)
+    return content
+
+
+def _store(path: Path, content: bytes) -> None:
+    try:
+        EXPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+        evict_exports()
+    except OSError as e:
+        print("⚠️ Error caching export:", e)
+
+
+def evict_exports(max_bytes: int = EXPORT_CACHE_BYTES) -> None:
+    """Delete least recently used exports until the cache fits in `max_bytes`."""
+    files = []
+    for path in EXPORT_CACHE_DIR.glob("*.*"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _sign(payload: str) -> str:
+    return hmac.new(EXPORT_SECRET, payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def export_token(path: Path, ttl: int = EXPORT_LINK_TTL) -> tuple[str, int]:
+    """
+    A download token for a cached export file, valid for `ttl` seconds.
+    Returns `(token, expiry as a unix timestamp)`.
+    """
+    if not EXPORT_SECRET:
+        raise ValueError("EXPORT_SECRET environment variable is not set.")
+    expires = int(time.time()) + ttl
+    payload = f"{path.name}.{expires}"
+    return f"{payload}.{_sign(payload)}", expires
+
+
+def resolve_export(token: str) -> Path | None:
+    """
+    The cached export a token points to, or None if the token is forged or
+    expired. The file itself may since have been evicted.
+    """
+    try:
+        payload, signature = token.rsplit(".", 1)
+        name, expires = payload.rsplit(".", 1)
+        if int(expires) < time.time():
+            return None
+    except ValueError:
+        return None
+    if not EXPORT_SECRET or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    return EXPORT_CACHE_DIR / name
+
+
+def prebuild_exports(ds: data.Dataset) -> list[Future]:
+    """Build the unfiltered exports for a new snapshot in the background."""
+    key = filter_key(ds)
+    return [export_pool.submit(cached_export, ds.df, fmt, key) for fmt in EXPORT_FORMATS]
+
+
+async def generate_export(
+    df: pl.DataFrame, fmt: str, key: tuple | None = None, gzipped: bool = False
+) -> bytes:
+    """
+    Build an export in the pool so other sessions keep being served meanwhile.
+    See cached_export().
+    """
+    loop = asyncio.get_running_loop()
+    with metrics.span("export", format=fmt) as s:
+        content = await loop.run_in_executor(export_pool, cached_export, df, fmt, key, gzipped)
+        s["rows_in"], s["bytes"] = df.height, len(content)
+    return content
@@ -1,44 +1,198 @@
 import os
+import ast
 import json
+import sys
+from pathlib import Path
+from string import Formatter
 from typing import Dict
 
+# Default language, used when a visitor expresses no preference
 LANG: str = os.getenv("LANGUAGE", "CN").upper()
+# Languages this process serves, e.g. "CN,EN"; each one loads its own dataset
+LANGUAGES: list[str] = [
+    lang.strip().upper() for lang in os.getenv("LANGUAGES", LANG).split(",") if lang.strip()
+]
+# Accepted spellings of each language in ?lang= and Accept-Language
+ALIASES: Dict[str, str] = {"cn": "CN", "zh": "CN", "en": "EN"}
+
+for lang in [LANG, *LANGUAGES]:
+    if lang not in ['CN', 'EN']:
+        raise ValueError(f"Unsupported language: {lang}")
+if LANG not in LANGUAGES:
+    LANGUAGES.insert(0, LANG)
+
 translation: Dict[str, str] = {}
+try:
+    with open(Path(__file__).parent / 'translation.json', 'r', encoding='utf-8') as f:
+        translation = json.load(f)
+        # ensure str->str mapping
+        if not isinstance(translation, dict):
+            translation = {}
+        else:
+            translation = {str(k): str(v) for k, v in translation.items()}
+except Exception:
+    # If the file can't be read, keep an empty mapping so lookups fall back to key
+    translation = {}
+
+# Chinese strings are the keys themselves
+catalogs: Dict[str, Dict[str, str]] = {"CN": {}, "EN": translation}
+
+
+class Template:
+    """
+    A translation with replacement fields, split once into its leading text and
+    `(field, literal)` pairs so formatting it skips str.format's parsing.
+    Fields with a format spec or conversion fall back to str.format.
+    """
+
+    __slots__ = ("text", "head", "pairs")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.head = ""
+        self.pairs: tuple[tuple[int | str, str], ...] | None = None
+        fields: list[int | str] = []
+        literals: list[str] = []
+        pending = ""
+        auto = 0
+        numbered = False
+        try:
+            # escaped braces ("{{") arrive as extra field-less chunks
+            for literal, field, spec, conversion in Formatter().parse(text):
+                pending += literal
+                if field is None:
+                    continue
+                if spec or conversion or "." in field or "[" in field:
+                    return
+                if (field == "" and numbered) or (field.isdigit() and auto):
+                    return  # mixes "{}" with "{0}", which str.format rejects
+                numbered = numbered or field.isdigit()
+                if field == "":
+                    fields.append(auto)
+                    auto += 1
+                else:
+                    fields.append(int(field) if field.isdigit() else field)
+                literals.append(pending)
+                pending = ""
+        except ValueError:
+            # malformed braces: str.format would fail, so the text is kept as is
+            return
+        literals.append(pending)
+        self.head = literals[0]
+        self.pairs = tuple(zip(fields, literals[1:]))
+
+    @property
+    def fields(self) -> list[int | str] | None:
+        return None if self.pairs is None else [field for field, _ in self.pairs]
+
+    def __call__(self, *args, **kwargs) -> str:
+        if self.pairs is None:
+            try:
+                return self.text.format(*args, **kwargs)
+            except Exception:
+                return self.text
+        out = self.head
+        try:
+            for field, literal in self.pairs:
+                out += format(args[field] if field.__class__ is int else kwargs[field]) + literal
+        except (IndexError, KeyError):
+            return self.text
+        return out
+
 
-if LANG not in ['CN', 'EN']:
-    raise ValueError(f"Unsupported language: {LANG}")
+def _compile(text: str) -> str | Template:
+    # static strings are interned so repeated renders share one object
+    return Template(text) if "{" in text or "}" in text else sys.intern(text)
 
-if LANG == 'EN':
-    try:
-        with open('translation.json', 'r', encoding='utf-8') as f:
-            translation = json.load(f)
-            # ensure str->str mapping
-            if not isinstance(translation, dict):
-                translation = {}
-            else:
-                translation = {str(k): str(v) for k, v in translation.items()}
-    except Exception:
-        # If the file can't be read, keep an empty mapping so lookups fall back to key
-        translation = {}
 
-def i18n(key: str, *args, **kwargs) -> str:
+# language -> key -> resolved string or split template, filled on first use
+_compiled: Dict[str, Dict[str, str | Template]] = {
+    lang: {key: _compile(value) for key, value in catalog.items()} for lang, catalog in catalogs.items()
+}
+
+
+def i18n(key: str, *args, lang: str = LANG, **kwargs) -> str:
     """
     Return localized string. Supports placeholders via Python str.format:
       i18n("Hello, {}!", "Alice") -> "Hello, Alice!"
       i18n("Welcome, {name}", name="Bob") -> "Welcome, Bob"
+      i18n("全部", lang="EN") -> "All"
 
     If formatting fails, returns the unformatted result.
     """
-    if LANG == 'CN':
-        result = key
-    else:
-        result = translation.get(key, key)
+    compiled = _compiled[lang]
+    entry = compiled.get(key)
+    if entry is None:
+        entry = compiled[key] = _compile(catalogs[lang].get(key, key))
 
+    if isinstance(entry, str):
+        return entry
     if not args and not kwargs:
-        return result
+        return entry.text
+    return entry(*args, **kwargs)
+
+
+def _calls(root: Path):
+    """Yield `(location, key)` for every i18n() call with a literal key in the modules in `root`."""
+    for path in sorted(root.glob("*.py")):
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            continue
+        for node in ast.walk(tree):
+            if (
+                isinstance(node, ast.Call)
+                and getattr(node.func, "id", getattr(node.func, "attr", None)) == "i18n"
+                and node.args
+                and isinstance(node.args[0], ast.Constant)
+                and isinstance(node.args[0].value, str)
+            ):
+                yield f"{path.relative_to(root)}:{node.lineno}", node.args[0].value
+
+
+def validate_catalog(root: Path = Path(__file__).parent) -> None:
+    """
+    Check that every literal key passed to i18n() in the app's modules has a
+    translation, with the same replacement fields, in each served language.
+    Raises ValueError listing the offending calls.
+    """
+    problems = []
+    for location, key in _calls(root):
+        for lang in LANGUAGES:
+            if lang == "CN":
+                continue
+            if key not in catalogs[lang]:
+                problems.append(f"{location}: {key!r} has no {lang} translation")
+                continue
+            # translations may reorder fields, but not drop or add any
+            expected, actual = _compile(key), _compiled[lang][key]
+            if set(getattr(expected, "fields", None) or ()) != set(getattr(actual, "fields", None) or ()):
+                problems.append(f"{location}: {lang} translation of {key!r} has other fields")
+    if problems:
+        raise ValueError("Incomplete translation.json:\n" + "\n".join(sorted(set(problems))))
+
+
+def negotiate(requested: str | None = None, accept_language: str | None = None) -> str:
+    """
+    Pick a served language from an explicit choice (e.g. `?lang=en`), falling
+    back to an Accept-Language header and then to LANG.
+    """
+    if requested:
+        lang = ALIASES.get(requested.strip().lower()[:2])
+        if lang in LANGUAGES:
+            return lang
 
-    try:
-        return result.format(*args, **kwargs)
-    except Exception:
-        # On any formatting error, return the raw (unformatted) result
-        return result
+    preferences = []
+    for i, part in enumerate((accept_language or "").split(",")):
+        tag, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        lang = ALIASES.get(tag.strip().lower()[:2])
+        if lang in LANGUAGES and quality > 0:
+            # stable: earlier tags win ties
+            preferences.append((-quality, i, lang))
+    return min(preferences)[2] if preferences else LANG
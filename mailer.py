@@ -0,0 +1,262 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import time
+import zlib
+from collections.abc import AsyncIterator
+
+import httpx
+
+import metrics
+from exports import export_pool
+
+# base64 maps 3 bytes to 4 characters, so chunks of 3n bytes concatenate cleanly
+B64_CHUNK = 3 * 64 * 1024
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class MailerBusy(Exception):
+    """The send queue is full."""
+
+
+class RateLimited(Exception):
+    """This address was sent to too recently."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def json_body(fields: dict, content: bytes | None) -> tuple[int, AsyncIterator[bytes]]:
+    """
+    Stream `fields` plus a base64 "content" member as a JSON object, encoding
+    chunk by chunk instead of holding the whole base64 string and JSON body.
+    Returns the exact body length, so no chunked transfer encoding is needed.
+    """
+    if content is None:
+        body = json.dumps(fields).encode()
+
+        async def single() -> AsyncIterator[bytes]:
+            yield body
+
+        return len(body), single()
+
+    head = json.dumps(fields)[:-1].encode() + b', "content": "'
+    tail = b'"}'
+
+    async def stream() -> AsyncIterator[bytes]:
+        yield head
+        view = memoryview(content)
+        for start in range(0, len(content), B64_CHUNK):
+            yield base64.b64encode(view[start : start + B64_CHUNK])
+        yield tail
+
+    return len(head) + 4 * math.ceil(len(content) / 3) + len(tail), stream()
+
+
+async def gzip_stream(body: AsyncIterator[bytes], stats: dict) -> AsyncIterator[bytes]:
+    """
+    Gzip `body` chunk by chunk, compressing in the export pool so the event
+    loop keeps serving sessions. Adds the bytes produced to `stats["bytes"]`.
+    """
+    loop = asyncio.get_running_loop()
+    packer = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    stats["bytes"] = 0
+    async for chunk in body:
+        packed = await loop.run_in_executor(export_pool, packer.compress, chunk)
+        if packed:
+            stats["bytes"] += len(packed)
+            yield packed
+    packed = packer.flush()
+    stats["bytes"] += len(packed)
+    yield packed
+
+
+class Mailer:
+    """
+    Posts exports to the mailing endpoint over one pooled keep-alive client.
+
+    With `transport="gzip"` each export is posted gzipped, split into chunks
+    of at most `chunk_size` bytes, in order; see parts().
+
+    At most `concurrency` exports are sent at a time and `queue_size` more may
+    wait, counted from reserve() to release(), so exports still being built
+    hold their place; posts are spaced at least `1 / rate` seconds apart globally and
+    `email_interval` seconds apart per address. Transport errors and
+    RETRY_STATUSES are retried with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        url: str | None,
+        *,
+        concurrency: int = 4,
+        queue_size: int = 32,
+        rate: float = 2.0,
+        email_interval: float = 30.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        compress: bool = False,
+        transport: str = "inline",
+        chunk_size: int = 10 * 1024 * 1024,
+        timeout: float = 60.0,
+    ):
+        if transport not in ("inline", "gzip"):
+            raise ValueError(f"Unsupported mail transport: {transport}")
+        self.url = url
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.rate = rate
+        self.email_interval = email_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.compress = compress
+        self.transport = transport
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._pending = 0
+        self._next_send = 0.0
+        self._last_sent: dict[str, float] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # created lazily so it binds to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        return self._client
+
+    def reserve(self, email: str) -> None:
+        """
+        Claim a send slot for `email`, to be given back with release() whether
+        or not anything is sent; raises RateLimited or MailerBusy.
+        """
+        now = time.monotonic()
+        last = self._last_sent.get(email)
+        if last is not None and now - last < self.email_interval:
+            metrics.inc("mgf_mail_rejected_total", reason="rate_limited")
+            raise RateLimited(self.email_interval - (now - last))
+        if self._pending >= self.concurrency + self.queue_size:
+            metrics.inc("mgf_mail_rejected_total", reason="busy")
+            raise MailerBusy()
+        self._pending += 1
+        self._last_sent[email] = now
+        # forget addresses whose interval has passed
+        if len(self._last_sent) > 1024:
+            self._last_sent = {
+                e: t for e, t in self._last_sent.items() if now - t < self.email_interval
+            }
+
+    def release(self) -> None:
+        """Give back the slot taken by reserve()."""
+        self._pending -= 1
+
+    def parts(self, fields: dict, content: bytes) -> list[tuple[dict, bytes]]:
+        """
+        Split an export into the payloads to post; with the gzip transport,
+        `content` is the gzipped export (see exports.cached_export). Gzipped
+        chunks carry "encoding", "chunk" (0-based), "chunks", their own
+        "chunk_sha256" and the "sha256" of the whole gzip stream, so the
+        receiver can verify each part and the reassembled file. Hashes large
+        exports, so call it off the event loop.
+        """
+        if self.transport == "inline":
+            return [(fields, content)]
+        count = max(1, math.ceil(len(content) / self.chunk_size))
+        digest = hashlib.sha256(content).hexdigest()
+        parts = []
+        for i in range(count):
+            part = content[i * self.chunk_size : (i + 1) * self.chunk_size]
+            parts.append((
+                {
+                    **fields,
+                    "encoding": "gzip",
+                    "sha256": digest,
+                    "chunk": i,
+                    "chunks": count,
+                    "chunk_sha256": hashlib.sha256(part).hexdigest(),
+                },
+                part,
+            ))
+        return parts
+
+    async def send(self, fields: dict, content: bytes | None) -> httpx.Response:
+        """
+        Post one payload within a slot taken by reserve(). Raises
+        httpx.TransportError once the retries are used up.
+        """
+        if not self.url:
+            raise ValueError("GOOGLE_SCRIPT_URL environment variable is not set.")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                await self._pace()
+                try:
+                    response = await self._post(fields, content)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                        return response
+                metrics.inc("mgf_mail_retries_total")
+                await asyncio.sleep(self.backoff * 2**attempt * (1 + random.random()))
+        raise AssertionError("unreachable")
+
+    async def _pace(self) -> None:
+        now = time.monotonic()
+        wait = self._next_send - now
+        self._next_send = max(now, self._next_send) + 1 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _post(self, fields: dict, content: bytes | None) -> httpx.Response:
+        assert self.url is not None
+        length, body = json_body(fields, content)
+        headers = {"Content-Type": "application/json"}
+        with metrics.span("mail_post") as s:
+            if self.compress:
+                # the compressed length is unknown up front, so the body is sent chunked
+                headers["Content-Encoding"] = "gzip"
+                response = await self.client.post(
+                    self.url, content=gzip_stream(body, s), headers=headers
+                )
+            else:
+                headers["Content-Length"] = str(length)
+                s["bytes"] = length
+                response = await self.client.post(self.url, content=body, headers=headers)
+            s["status"] = response.status_code
+        metrics.inc("mgf_mail_posts_total", status=response.status_code)
+        return response
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+mailer = Mailer(
+    os.getenv("GOOGLE_SCRIPT_URL"),
+    concurrency=int(os.getenv("MAIL_CONCURRENCY", "4")),
+    queue_size=int(os.getenv("MAIL_QUEUE", "32")),
+    rate=float(os.getenv("MAIL_RATE", "2")),
+    email_interval=float(os.getenv("MAIL_EMAIL_INTERVAL", "30")),
+    retries=int(os.getenv("MAIL_RETRIES", "3")),
+    compress=os.getenv("MAIL_GZIP", "0") == "1",
+    transport=os.getenv("MAIL_TRANSPORT", "inline"),
+    chunk_size=int(float(os.getenv("MAIL_CHUNK_MB", "10")) * 1024 * 1024),
+)
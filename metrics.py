@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+# Log one JSON line per span to the "mgf.metrics" logger
+METRICS_LOG: bool = os.getenv("METRICS_LOG", "0") == "1"
+# Upper bounds, in seconds, of the span duration histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Span fields accumulated into counters, with their metric names
+COUNTED = {
+    "rows_in": "mgf_rows_in_total",
+    "rows_out": "mgf_rows_out_total",
+    "bytes": "mgf_payload_bytes_total",
+}
+
+logger = logging.getLogger("mgf.metrics")
+if METRICS_LOG and not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+Labels = tuple[tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: dict[str, dict[Labels, float]] = {}
+_gauges: dict[str, dict[Labels, float]] = {}
+# name -> labels -> [bucket counts..., +Inf count, sum]
+_histograms: dict[str, dict[Labels, list[float]]] = {}
+# called at scrape time for values that live elsewhere, e.g. cache counters
+_collectors: list[Callable[[], Iterator[tuple[str, str, dict, float]]]] = []
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = _labels(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    with _lock:
+        _gauges.setdefault(name, {})[_labels(labels)] = value
+
+
+def add_gauge(name: str, value: float, **labels) -> None:
+    key = _labels(labels)
+    with _lock:
+        series = _gauges.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    key = _labels(labels)
+    with _lock:
+        counts = _histograms.setdefault(name, {}).setdefault(key, [0.0] * (len(BUCKETS) + 2))
+        counts[bisect_left(BUCKETS, seconds)] += 1
+        counts[-1] += seconds
+
+
+def collector(fn: Callable[[], Iterator[tuple[str, str, dict, float]]]):
+    """
+    Register `fn` to yield `(name, type, labels, value)` samples on every scrape.
+    Usable as a decorator.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[dict]:
+    """
+    Time a block as `mgf_span_seconds{span=name}`. The block may fill the
+    yielded dict: rows_in, rows_out and bytes are added to counters, and every
+    field is included in the structured log line. Exceptions are counted in
+    `mgf_span_errors_total` and re-raised.
+    """
+    fields: dict = {}
+    start = time.perf_counter()
+    try:
+        yield fields
+    except Exception as e:
+        fields["error"] = type(e).__name__
+        inc("mgf_span_errors_total", span=name, **labels)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        observe("mgf_span_seconds", seconds, span=name, **labels)
+        for field, metric in COUNTED.items():
+            if field in fields:
+                inc(metric, fields[field], span=name, **labels)
+        if METRICS_LOG:
+            logger.info(json.dumps(
+                {"span": name, "ms": round(seconds * 1000, 3), **labels, **fields},
+                ensure_ascii=False,
+                default=str,
+            ))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+        return f"{name}{{{inner}}} {float(value)!r}"
+    return f"{name} {float(value)!r}"
+
+
+def render() -> str:
+    """All metrics of this worker in the Prometheus text exposition format."""
+    pid = str(os.getpid())
+    families: dict[str, tuple[str, list[str]]] = {}
+
+    def sample(name: str, kind: str, labels: Labels, value: float, family: str | None = None):
+        family = family or name
+        families.setdefault(family, (kind, []))[1].append(
+            _format(name, (("worker", pid),) + labels, value)
+        )
+
+    with _lock:
+        for name, series in _counters.items():
+            for labels, value in series.items():
+                sample(name, "counter", labels, value)
+        for name, series in _gauges.items():
+            for labels, value in series.items():
+                sample(name, "gauge", labels, value)
+        for name, series in _histograms.items():
+            for labels, counts in series.items():
+                cumulative = 0.0
+                for bound, count in zip((*BUCKETS, "+Inf"), counts[:-1]):
+                    cumulative += count
+                    sample(f"{name}_bucket", "histogram", labels + (("le", str(bound)),), cumulative, name)
+                sample(f"{name}_count", "histogram", labels, cumulative, name)
+                sample(f"{name}_sum", "histogram", labels, counts[-1], name)
+    for fn in _collectors:
+        for name, kind, labels, value in fn():
+            sample(name, kind, _labels(labels), value)
+
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines += samples
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,219 @@
+import os
+from bisect import bisect_left
+from collections.abc import Callable
+from functools import reduce
+
+import polars as pl
+
+from cache import LRUCache
+from data import Dataset, facet_cube, on_refresh
+from i18n import i18n
+
+# Shared by every session in the process; holds row indices, not frames
+FILTER_CACHE_SIZE: int = int(os.getenv("FILTER_CACHE_SIZE", "512"))
+filter_cache: LRUCache[pl.Series] = LRUCache(FILTER_CACHE_SIZE)
+# Option counts of the selects, per filter combination
+facet_cache: LRUCache[dict] = LRUCache(FILTER_CACHE_SIZE)
+
+
+def filter_key(
+    ds: Dataset,
+    region: str | None = None,
+    type: str | None = None,
+    year: str | None = None,
+    keyword: str = "",
+) -> tuple:
+    """A hashable key identifying a filter combination on one data version."""
+    # keyword matching is case-insensitive, so normalize it into the key
+    return (ds.sha, region, type, year, keyword.strip().lower())
+
+
+def filter_rows(
+    ds: Dataset,
+    region: str | None = None,
+    type: str | None = None,
+    year: str | None = None,
+    keyword: str = "",
+) -> pl.Series:
+    """
+    Return the ascending row indices of `ds.df` matching every given filter.
+    `None` means "all" for the select filters. Results are memoized per data
+    version, so sessions choosing the same filters share one computation.
+    """
+    key = filter_key(ds, region, type, year, keyword)
+    rows = filter_cache.get(key)
+    if rows is None:
+        rows = _filter_rows(ds, *key[1:], within=_prefix_rows(key))
+        filter_cache.put(key, rows)
+    return rows
+
+
+def _prefix_rows(key: tuple) -> pl.Series | None:
+    """
+    The cached result for the longest proper prefix of the keyword in `key`,
+    under the same other filters. Every match of a keyword also matches its
+    prefixes, so a user typing on narrows the previous result instead of
+    searching again from scratch.
+    """
+    *rest, keyword = key
+    for end in range(len(keyword) - 1, -1, -1):
+        rows = filter_cache.peek((*rest, keyword[:end]))
+        if rows is not None:
+            return rows
+    return None
+
+
+def _filter_rows(
+    ds: Dataset,
+    region: str | None,
+    type: str | None,
+    year: str | None,
+    keyword: str,
+    within: pl.Series | None = None,
+) -> pl.Series:
+    """`within`, if given, is a superset of the result: see _prefix_rows()."""
+    # df is sorted by date, so a year is a contiguous row range
+    start, end = 0, ds.df.height
+    if year is not None:
+        start, end = ds.year_ranges.get(int(year), (0, 0))
+
+    masks: list[pl.Series] = []
+    if region is not None:
+        mask = ds.region_masks.get(region)
+        masks.append(mask if mask is not None else pl.repeat(False, ds.df.height, eager=True))
+    if type is not None:
+        code = _type_code(ds, type)
+        masks.append(
+            (ds.type_codes == code).fill_null(False)
+            if code is not None
+            else pl.repeat(False, ds.df.height, eager=True)
+        )
+    masks = [mask.slice(start, end - start) for mask in masks]
+
+    if keyword:
+        rows = ds.keywords.search(keyword, within)
+        rows = rows.filter((rows >= start) & (rows < end))
+        if masks:
+            rows = rows.filter(reduce(lambda a, b: a & b, masks).gather(rows - start))
+        return rows
+    if masks:
+        return reduce(lambda a, b: a & b, masks).arg_true() + start
+    return pl.int_range(start, end, dtype=pl.UInt32, eager=True)
+
+
+def _matching(
+    ds: Dataset,
+    rows: pl.Series,
+    region: str | None,
+    type: str | None,
+    year: str | None,
+    keyword: str,
+) -> pl.Series:
+    """The ascending `rows` matching every given filter, checked row by row."""
+    mask = pl.repeat(True, len(rows), eager=True)
+    if region is not None:
+        region_mask = ds.region_masks.get(region)
+        mask &= region_mask.gather(rows) if region_mask is not None else False
+    if type is not None:
+        code = _type_code(ds, type)
+        mask &= ds.type_codes.gather(rows) == code if code is not None else False
+    if year is not None:
+        mask &= ds.year.gather(rows) == int(year)
+    if keyword:
+        mask &= ds.keywords.text.gather(rows).str.contains(keyword, literal=True)
+    return rows.filter(mask.fill_null(False))
+
+
+def _carry_over(ds: Dataset) -> None:
+    """
+    Seed the cache of a synced snapshot with the previous snapshot's results,
+    renumbered through its delta. Only the added rows are filtered, so searches
+    users already ran stay cached across an upstream update.
+    """
+    delta = ds.delta
+    if delta is None:
+        return
+    for key, rows in filter_cache.items():
+        if key[0] != delta.base_sha:
+            continue
+        kept = delta.remap.gather(rows).drop_nulls()
+        added = _matching(ds, delta.added, *key[1:])
+        filter_cache.put((ds.sha, *key[1:]), pl.concat([kept, added]).sort())
+
+
+on_refresh(_carry_over)
+
+
+def _type_code(ds: Dataset, type: str) -> int | None:
+    """The position of `type` in the sorted `ds.types`, i.e. its code in `ds.type_codes`."""
+    i = bisect_left(ds.types, type)
+    return i if i < len(ds.types) and ds.types[i] == type else None
+
+
+def facet_counts(
+    ds: Dataset,
+    region: str | None = None,
+    type: str | None = None,
+    year: str | None = None,
+    keyword: str = "",
+) -> dict[str, dict]:
+    """
+    For each select, how many rows each of its options would match under the
+    other current filters: `{"region": {"total": n, "counts": {option: n}}, ...}`,
+    with "total" counting the "all" option. Options matching nothing are left out.
+    Memoized like filter_rows().
+    """
+    key = filter_key(ds, region, type, year, keyword)
+    counts = facet_cache.get(key)
+    if counts is None:
+        counts = _facet_counts(ds, *key[1:])
+        facet_cache.put(key, counts)
+    return counts
+
+
+def _facet_counts(
+    ds: Dataset, region: str | None, type: str | None, year: str | None, keyword: str
+) -> dict[str, dict]:
+    cube = ds.facets
+    if keyword:
+        # only the matches of the keyword are counted
+        rows = filter_rows(ds, keyword=keyword)
+        cube = facet_cube(
+            ds.df[i18n("经济体", lang=ds.lang)].gather(rows),
+            ds.type_codes.gather(rows),
+            ds.year.gather(rows),
+        )
+
+    everything = pl.lit(True)
+    by_region = everything
+    if region is not None:
+        naming = ds.region_members.filter(pl.col("member") == region)["regions"]
+        by_region = pl.col("regions").is_in(naming)
+    by_type = everything
+    if type is not None:
+        code = _type_code(ds, type)
+        by_type = pl.col("type") == code if code is not None else pl.lit(False)
+    by_year = pl.col("year") == int(year) if year is not None else everything
+
+    def counts(frame: pl.DataFrame, column: str, label: Callable[[object], str]) -> dict[str, int]:
+        totals = frame.drop_nulls(column).group_by(column).agg(pl.col("n").sum())
+        return {label(value): int(n) for value, n in totals.iter_rows()}
+
+    regions = cube.filter(by_type & by_year)
+    types = cube.filter(by_region & by_year)
+    years = cube.filter(by_region & by_type)
+    return {
+        "region": {
+            "total": int(regions["n"].sum()),
+            # a row naming several economies counts under each of them
+            "counts": counts(regions.join(ds.region_members, on="regions"), "member", str),
+        },
+        "type": {
+            "total": int(types["n"].sum()),
+            "counts": counts(types, "type", lambda code: ds.types[code]),
+        },
+        "year": {
+            "total": int(years["n"].sum()),
+            "counts": counts(years, "year", str),
+        },
+    }
@@ -0,0 +1,99 @@
+import polars as pl
+
+# Joins a row's columns; never typed by users, so matches cannot span columns
+SEPARATOR = "\x1f"
+# Once this few candidates remain, verifying them beats more intersections
+VERIFY_THRESHOLD = 256
+
+
+def haystack(df: pl.DataFrame) -> pl.Series:
+    """One lowercased string per row joining all of its text (string or categorical) columns."""
+    columns = [col for col, dtype in df.schema.items() if dtype in (pl.String, pl.Categorical)]
+    return df.select(
+        pl.concat_str(
+            [pl.col(col).cast(pl.String).fill_null("") for col in columns], separator=SEPARATOR
+        ).str.to_lowercase()
+    ).to_series()
+
+
+def build_postings(text: pl.Series, n: int = 2) -> pl.DataFrame:
+    """Every n-gram of `text` with the ascending rows containing it, sorted by gram."""
+    return (
+        pl.DataFrame({"text": text})
+        .with_row_index("row")
+        .select(
+            "row",
+            # every overlapping n-gram: non-overlapping matches at each offset
+            pl.concat_list(
+                pl.col("text").str.slice(offset).str.extract_all(f"(?s).{{{n}}}")
+                for offset in range(n)
+            ).alias("gram"),
+        )
+        .explode("gram")
+        .filter(pl.col("gram").is_not_null() & ~pl.col("gram").str.contains(SEPARATOR, literal=True))
+        .unique()
+        .group_by("gram")
+        .agg(pl.col("row").sort())
+        .sort("gram")
+    )
+
+
+class KeywordIndex:
+    """
+    Character n-gram inverted index over the string columns of a frame.
+
+    Bigrams suit CJK text, where words are not space-delimited; longer grams are
+    more selective for alphabetic text. Posting lists only narrow the candidate
+    rows: every candidate is verified with a literal substring match, so results
+    are identical to scanning each column with `str.contains(..., literal=True)`.
+
+    `text` comes from haystack() and `postings` from build_postings(). Both are
+    plain frames, so they can be memory-mapped from a snapshot and shared.
+    """
+
+    def __init__(self, text: pl.Series, postings: pl.DataFrame, n: int = 2):
+        self.n = n
+        self.text = text
+        # sorted, so grams are found by binary search rather than a per-worker dict
+        self._grams: pl.Series = postings["gram"]
+        self._postings: pl.Series = postings["row"]
+
+    def _slot(self, gram: str) -> int | None:
+        slot = self._grams.search_sorted(gram)
+        if slot < len(self._grams) and self._grams[slot] == gram:
+            return slot
+        return None
+
+    def search(self, keyword: str, within: pl.Series | None = None) -> pl.Series:
+        """
+        Return the ascending row indices whose text contains `keyword`.
+        `within` optionally restricts the search to those ascending rows,
+        e.g. the earlier result for a prefix of `keyword`.
+        """
+        keyword = keyword.lower()
+        n = self.n
+        grams = {keyword[i : i + n] for i in range(len(keyword) - n + 1)}
+
+        if not grams:
+            # too short to index
+            candidates = (
+                within if within is not None
+                else pl.int_range(0, len(self.text), dtype=pl.UInt32, eager=True)
+            )
+        else:
+            slots = [self._slot(gram) for gram in grams]
+            if None in slots:
+                return pl.Series("row", [], dtype=pl.UInt32)
+            lists = [self._postings[slot] for slot in slots]
+            if within is not None:
+                lists.append(within)
+            lists.sort(key=len)
+            candidates = lists[0]
+            for rows in lists[1:]:
+                if len(candidates) <= VERIFY_THRESHOLD:
+                    break
+                candidates = candidates.filter(candidates.is_in(rows))
+
+        return candidates.filter(
+            self.text.gather(candidates).str.contains(keyword, literal=True)
+        )
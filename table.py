@@ -1,9 +1,25 @@
-from htmltools import tags, Tag
+from htmltools import tags, Tag, HTML
 import polars as pl
+import json
 import math
-from i18n import i18n, LANG
+from urllib.parse import quote
+from i18n import i18n, catalogs, LANG
+
+# pager labels, resolved once per language rather than on every render
+LABELS: dict[str, dict[str, str]] = {
+    lang: {
+        "first": i18n("首页", lang=lang),
+        "prev": i18n("上一页", lang=lang),
+        "next": i18n("下一页", lang=lang),
+        "last": i18n("末页", lang=lang),
+        # around the page number: "第 3 页" / "Page 3"
+        "before": i18n("第", lang=lang) if lang == "CN" else i18n("页", lang=lang),
+        "after": i18n("页", lang=lang) if lang == "CN" else "",
+    }
+    for lang in catalogs
+}
 
-def render_pagination(id: str, current: int, total: int) -> Tag:
+def render_pagination(id: str, current: int, total: int, lang: str = LANG) -> Tag:
     def page_btn(label, page, active=False):
         return tags.button(
             label,
@@ -12,10 +28,11 @@ def render_pagination(id: str, current: int, total: int) -> Tag:
         )
 
     buttons = []
+    labels = LABELS[lang]
 
     # 首页 / 上一页
-    buttons.append(page_btn(i18n("首页"), 1))
-    buttons.append(page_btn(i18n("上一页"), max(1, current - 1)))
+    buttons.append(page_btn(labels["first"], 1))
+    buttons.append(page_btn(labels["prev"], max(1, current - 1)))
 
     # Page numbers
     # Page range: max 5 buttons, centered on current page
@@ -28,150 +45,163 @@ def render_pagination(id: str, current: int, total: int) -> Tag:
         buttons.append(page_btn(str(i), i, active=(i == current)))
 
     # 下一页 / 末页
-    buttons.append(page_btn(i18n("下一页"), min(total, current + 1)))
-    buttons.append(page_btn(i18n("末页"), total))
+    buttons.append(page_btn(labels["next"], min(total, current + 1)))
+    buttons.append(page_btn(labels["last"], total))
 
     return tags.div(
-        tags.style("""
-            .page-btn {
-                border: 1px solid #ccc;
-                background: white;
-                padding: 4px 10px;
-                margin: 0 2px;
-                cursor: pointer;
-            }
-            .page-btn:hover {
-                background-color: rgb(22, 171, 127);
-                color: white;
-            }
-            .active-page {
-                background-color: rgb(13, 97, 72);
-                color: white;
-                font-weight: bold;
-            }
-        """),
         tags.div(
             *buttons,
-            *render_dropdown(current, total),
-            style=(
-                "display: flex; "
-                "align-items: center; "
-                "flex-wrap: wrap; "
-                "gap: 4px; "
-                "justify-content: center;"
-                "margin: 1em; "
-            ),
+            *render_page_jump(id, current, total, lang),
+            class_="pagination-controls",
         ),
     )
 
-def render_dropdown(current: int, total: int):
-    dropdown = tags.select(
-        *[tags.option(str(i), selected=(i == current)) for i in range(1, total + 1)],
-        onchange=f'Shiny.setInputValue("{id}_page", parseInt(this.value), {{priority: "event"}})',
-        # style="margin-left: 1em;",
+def render_page_jump(id: str, current: int, total: int, lang: str = LANG):
+    """
+    A jump-to-page number box, the same size however many pages there are.
+    The browser clamps the entry to 1..total; the server validates it again.
+    """
+    jump = tags.input(
+        type="number",
+        value=current,
+        min=1,
+        max=total,
+        step=1,
+        class_="page-jump",
+        onchange=f'mgfJumpToPage(this, "{id}_page")',
     )
-    if LANG == 'CN':
-        text1 = tags.span(i18n("第"), style="margin-left: 4px;"),
-        text2 = tags.span(i18n("页")),
-        return (text1, dropdown, text2)
-    elif LANG == 'EN':
-        text = tags.span(i18n("页"), style="margin-left: 4px;"),
-        return (text, dropdown)
+    if lang == 'CN':
+        text1 = tags.span(LABELS[lang]["before"], class_="page-label"),
+        text2 = tags.span(LABELS[lang]["after"]),
+        return (text1, jump, text2)
+    elif lang == 'EN':
+        text = tags.span(LABELS[lang]["before"], class_="page-label"),
+        return (text, jump)
     else:
-        raise ValueError(f"Unsupported language: {LANG}")
+        raise ValueError(f"Unsupported language: {lang}")
 
 def output_paginated_table(
-    id: str, df: pl.DataFrame, page: int = 1, per_page: int = 10
+    id: str,
+    df: pl.DataFrame,
+    page: int = 1,
+    per_page: int = 10,
+    rows: pl.Series | None = None,
+    client_side: bool = False,
+    id_column: str | None = None,
+    href: str | None = None,
+    lang: str = LANG,
 ) -> Tag:
+    """
+    `rows` optionally selects, in order, the rows of `df` to paginate. Only the
+    visible page is gathered from `df`, so rendering cost does not depend on
+    how many rows matched.
+
+    Clicking a row sets input `id` to the row's `id_column` value, which is not
+    displayed; without one, the “政策动态” column (index 1) is used.
+    With `href`, a URL template such as "policy/{}", that column also links
+    to the row's own page, for sharing and crawlers.
+
+    With `client_side`, every selected row is shipped once and the browser
+    switches pages itself, without a round-trip per page click.
+    """
+    if client_side:
+        return output_client_table(
+            id, df if rows is None else df[rows], per_page, id_column=id_column, href=href, lang=lang
+        )
+
     # Extract page slice
-    total_rows = df.shape[0]
+    total_rows = df.height if rows is None else rows.len()
     total_pages = max(math.ceil(total_rows / per_page), 1)
+    page = min(max(page, 1), total_pages)
     start = (page - 1) * per_page
-    end = start + per_page
-    slice_df = df[start:end, :6]  # first 6 columns only
+    if rows is None:
+        slice_df = df[start : start + per_page]
+    else:
+        slice_df = df[rows.slice(start, per_page)]
+    if id_column is None:
+        slice_df = slice_df[:, :6]  # first 6 columns only
+        policy_ids = slice_df[:, 1].cast(pl.String)  # Assume column index 1 is “政策动态”
+    else:
+        policy_ids = slice_df[id_column]
+        slice_df = slice_df.drop(id_column)[:, :6]
 
     # Header
     thead = tags.thead(tags.tr(*(tags.th(col) for col in slice_df.columns)))
 
     # Rows
     tbody = tags.tbody()
-    for row in slice_df.iter_rows():
-        policy_id = str(row[1])  # Assume column index 1 is “政策动态”
-
+    for row, policy_id in zip(slice_df.iter_rows(), policy_ids):
         # Build each cell with a column-specific class
         row_cells = [
             tags.td(
-                str(cell),
+                tags.a(str(cell), href=href.format(quote(policy_id)), class_="policy-link")
+                if href is not None and i == 1
+                else str(cell),
                 class_=f"col-{col_name}"
             )
-            for col_name, cell in zip(slice_df.columns, row)
+            for i, (col_name, cell) in enumerate(zip(slice_df.columns, row))
         ]
 
         # Wrap the row with onclick handler
         row_tag = tags.tr(
             *row_cells,
-            onclick=f'Shiny.setInputValue("{id}", "{policy_id}", {{priority: "event"}});',
+            onclick=f'Shiny.setInputValue({json.dumps(id)}, {json.dumps(policy_id)}, {{priority: "event"}});',
             class_="clickable-row"
         )
         tbody.append(row_tag)
 
     # Pagination controls
-    pagination = render_pagination(id, page, total_pages)
+    pagination = render_pagination(id, page, total_pages, lang)
 
     table = tags.table(thead, tbody, class_="custom-table")
     return tags.div(
-        tags.style("""
-            .custom-table {
-                border-collapse: collapse;
-                width: 100%;
-                table-layout: auto;
-            }
-            .custom-table th {
-                text-align: left;
-                font-weight: bold;
-                padding: 16px 8px;
-                border-bottom: 2px solid #ddd; /* Thick bottom border for header */
-                white-space: nowrap;
-            }
-            .custom-table td {
-                border: 1px solid #eee;
-                padding: 14px 8px;
-                white-space: nowrap;
-            }
-
-            /* Remove vertical borders */
-            .custom-table th,
-            .custom-table td {
-                border-left: none;
-                border-right: none;
-            }
-
-            /* Allow wrapping only for the 发布主体 column */
-            .custom-table .col-发布主体 {
-                white-space: normal;
-                word-break: break-word;
-            }
-
-            .clickable-row {
-                cursor: pointer;
-                transition: background-color 0.2s;
-            }
-
-            .clickable-row:hover {
-                background-color: rgba(13, 97, 72, 0.1);
-            }
-
-            .clickable-row td {
-                /* Ensures no text underlines or color overrides interfere */
-                color: black;
-                text-decoration: none;
-}
-        """),
         table,
         pagination,
     )
 
 
+def output_client_table(
+    id: str,
+    df: pl.DataFrame,
+    per_page: int = 10,
+    id_column: str | None = None,
+    href: str | None = None,
+    lang: str = LANG,
+) -> Tag:
+    if id_column is None:
+        df = df[:, :6]  # first 6 columns only
+        ids = df[:, 1].cast(pl.String)
+    else:
+        ids = df[id_column]
+        df = df.drop(id_column)[:, :6]
+    config = {
+        "id": id,
+        "per_page": per_page,
+        "columns": df.columns,
+        "data": df.rows(),
+        "ids": ids.to_list(),
+        "href": href,
+        "labels": LABELS[lang],
+    }
+    root_id = f"{id}_client"
+    return tags.div(
+        tags.table(
+            tags.thead(tags.tr(*(tags.th(col) for col in df.columns))),
+            tags.tbody(),
+            class_="custom-table",
+        ),
+        tags.div(class_="pagination-controls client-pagination"),
+        # "</" must not appear inside a script element
+        tags.script(
+            HTML(json.dumps(config, ensure_ascii=False, default=str).replace("</", "<\\/")),
+            type="application/json",
+        ),
+        # mgfClientTable is defined in www/table.js
+        tags.script(HTML(f"mgfClientTable({json.dumps(root_id)});")),
+        id=root_id,
+    )
+
+
 if __name__ == "__main__":
     # Example usage
     df = pl.DataFrame(
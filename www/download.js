@@ -0,0 +1,23 @@
+document.addEventListener("DOMContentLoaded", function() {
+    const email = localStorage.getItem("user_email");
+    const inst = localStorage.getItem("user_inst");
+    if (email) {
+        const emailInput = document.getElementById("user_email");
+        if (emailInput) {
+            emailInput.value = email; // update UI
+            //Shiny.setInputValue("user_email", email); // update server input
+        }
+    }
+
+    if (inst) {
+        const instInput = document.getElementById("user_inst");
+        if (instInput) {
+            instInput.value = inst;
+            //Shiny.setInputValue("user_inst", inst);
+        }
+    }
+});
+Shiny.addCustomMessageHandler("storeUserInfo", function(message) {
+    localStorage.setItem("user_email", message.email);
+    localStorage.setItem("user_inst", message.inst);
+});
@@ -0,0 +1,113 @@
+// Jump-to-page box: clamp the entry to 1..max and report it as `inputId`
+window.mgfJumpToPage = function(box, inputId) {
+    const page = Math.min(Math.max(parseInt(box.value) || 1, 1), parseInt(box.max) || 1);
+    box.value = page;
+    Shiny.setInputValue(inputId, page, {priority: "event"});
+};
+
+// Titles link to their policy pages for sharing and crawlers; a plain click
+// still opens the in-app detail view through the row's handler
+document.addEventListener("click", function(event) {
+    const link = event.target.closest("a.policy-link");
+    if (link && event.button === 0 && !(event.ctrlKey || event.metaKey || event.shiftKey || event.altKey)) {
+        event.preventDefault();
+    }
+});
+
+// Facet counts from the server: label every filter option with the number of
+// rows it would leave and disable the options that leave none. The "all"
+// option and the current selection always stay enabled.
+let mgfFacets = null;
+
+function mgfApplyFacets() {
+    if (!mgfFacets) return;
+    for (const [id, facet] of Object.entries(mgfFacets)) {
+        const select = document.getElementById(id);
+        if (!select) continue;
+        Array.from(select.options).forEach((option, i) => {
+            if (option.dataset.label === undefined) option.dataset.label = option.textContent;
+            const n = i === 0 ? facet.total : (facet.counts[option.value] || 0);
+            option.textContent = `${option.dataset.label} (${n})`;
+            option.disabled = i > 0 && n === 0 && !option.selected;
+        });
+    }
+}
+
+Shiny.addCustomMessageHandler("mgf-facets", function(message) {
+    mgfFacets = message;
+    mgfApplyFacets();
+});
+// new snapshots replace the options (ui.update_select); label those too
+$(document).on("shiny:updateinput", () => setTimeout(mgfApplyFacets, 0));
+
+// Renders pages of a table shipped as JSON, mirroring the server-side markup
+window.mgfClientTable = function(rootId) {
+    const root = document.getElementById(rootId);
+    if (!root) return;
+    const cfg = JSON.parse(root.querySelector('script[type="application/json"]').textContent);
+    const tbody = root.querySelector("tbody");
+    const nav = root.querySelector(".client-pagination");
+    const total = Math.max(Math.ceil(cfg.data.length / cfg.per_page), 1);
+
+    function button(label, page, active) {
+        const btn = document.createElement("button");
+        btn.textContent = label;
+        btn.className = "page-btn" + (active ? " active-page" : "");
+        btn.onclick = () => render(page);
+        return btn;
+    }
+
+    function render(page) {
+        page = Math.min(Math.max(page, 1), total);
+        tbody.replaceChildren();
+        const offset = (page - 1) * cfg.per_page;
+        cfg.data.slice(offset, offset + cfg.per_page).forEach((row, r) => {
+            const tr = document.createElement("tr");
+            tr.className = "clickable-row";
+            tr.onclick = () => Shiny.setInputValue(cfg.id, cfg.ids[offset + r], {priority: "event"});
+            row.forEach((cell, i) => {
+                const td = document.createElement("td");
+                const text = cell === null ? "" : String(cell);
+                if (cfg.href && i === 1) {
+                    const a = document.createElement("a");
+                    a.textContent = text;
+                    a.href = cfg.href.replace("{}", encodeURIComponent(cfg.ids[offset + r]));
+                    a.className = "policy-link";
+                    td.appendChild(a);
+                } else {
+                    td.textContent = text;
+                }
+                td.className = "col-" + cfg.columns[i];
+                tr.appendChild(td);
+            });
+            tbody.appendChild(tr);
+        });
+
+        nav.replaceChildren();
+        nav.appendChild(button(cfg.labels.first, 1));
+        nav.appendChild(button(cfg.labels.prev, Math.max(1, page - 1)));
+        const end = Math.min(total, Math.max(1, page - 2) + 4);
+        for (let i = Math.max(1, end - 4); i <= end; i++) {
+            nav.appendChild(button(String(i), i, i === page));
+        }
+        nav.appendChild(button(cfg.labels.next, Math.min(total, page + 1)));
+        nav.appendChild(button(cfg.labels.last, total));
+
+        const jump = document.createElement("input");
+        Object.assign(jump, {type: "number", min: 1, max: total, step: 1, value: page});
+        jump.className = "page-jump";
+        jump.onchange = () => render(parseInt(jump.value) || 1);
+        const before = document.createElement("span");
+        before.textContent = cfg.labels.before;
+        before.className = "page-label";
+        nav.appendChild(before);
+        nav.appendChild(jump);
+        if (cfg.labels.after) {
+            const after = document.createElement("span");
+            after.textContent = cfg.labels.after;
+            nav.appendChild(after);
+        }
+    }
+
+    render(1);
+};